@@ -1,122 +1,280 @@
-from flask import Flask, request, jsonify, render_template, flash, redirect, url_for, session, g
-from database import db, bcrypt
+from flask import Flask, request, jsonify, render_template, flash, redirect, url_for, session, g, get_template_attribute, make_response, abort, send_file
+from database import db
+from flask_migrate import Migrate
+from sqlalchemy import insert, update, tuple_
 from sqlalchemy.exc import IntegrityError
+from werkzeug.http import is_resource_modified
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
-from models import Champion, User, Favorite, Comment
+from models import Champion, ChampionTag, Tag, User, Favorite, Comment, SeedVersion
 from forms import SignupForm, LoginForm, UserEditForm, CommentForm
 from riotwatcher import LolWatcher
 from api_keys import RIOT_API_KEY, SECRET_KEY, DATABASE_URI
+from cache import make_cache
+from metrics import RequestMetrics
+from replicas import REPLICA_BIND, ReplicaRouter, engine_options, read_only
+from assets import AssetBuilder, is_fingerprinted, load_manifest
+from bundle import BUNDLE_NAME, bundle_name, write_bundle, find_variant
+from images import VARIANTS as IMAGE_VARIANTS, IMAGE_PATH, cdn_path, cached_image
+from catalog import champion_catalog
+from ddragon import HttpSource, open_source, DEFAULT_CONCURRENCY
+from search import DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT, MAX_LIMIT as MAX_SEARCH_LIMIT
+import click
 import requests
+import hashlib
+from datetime import datetime
+import json
+import mimetypes
+import os
 
 CURR_USER_KEY = "curr_user"
-
-API_URL = "https://ddragon.leagueoflegends.com/cdn/13.14.1"
+CURR_USER_CLAIMS_KEY = "curr_user_claims"
+SEED_BATCH_SIZE = 50
+CHAMPION_FRAGMENT_CACHE_SIZE = 256
+PAGE_CACHE_SIZE = 512
+PAGE_CACHE_TIMEOUT = 60 * 60
+SHARED_CACHE_MAX_AGE = 300
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+IMAGE_MAX_AGE = 30 * 24 * 60 * 60
+LISTING_PAGE_SIZE = 24
+
+DDRAGON_URL = "https://ddragon.leagueoflegends.com"
+DDRAGON_VERSION = "13.14.1"
+API_URL = f"{DDRAGON_URL}/cdn/{DDRAGON_VERSION}"
 lol_watcher = LolWatcher(RIOT_API_KEY)
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = DATABASE_URI
+# e.g. SQLALCHEMY_DATABASE_URI=sqlite:// for fast in-memory test and benchmark runs, which
+# build the schema with db.create_all(); `flask db upgrade` targets PostgreSQL
+app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('SQLALCHEMY_DATABASE_URI', DATABASE_URI)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+# Read-only views query this replica, when one is configured
+if os.environ.get('SQLALCHEMY_REPLICA_URI'):
+    replica_uri = os.environ['SQLALCHEMY_REPLICA_URI']
+    app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND: {'url': replica_uri, **engine_options(replica_uri)}}
 app.config['SECRET_KEY'] = SECRET_KEY
+app.config['CHAMPION_BUNDLE_DIR'] = os.path.join(app.static_folder, 'bundles')
+app.config['ASSETS_DIR'] = os.path.join(app.static_folder, 'dist')
+app.config['IMAGE_CACHE_DIR'] = os.path.join(app.instance_path, 'images')
+app.config['IMAGE_ORIGIN'] = DDRAGON_URL
+# e.g. CACHE_URL=redis://localhost:6379/0 to share cached pages between workers
+app.config['CACHE_URL'] = os.environ.get('CACHE_URL')
+# Bearer token that lets a remote Prometheus scrape /metrics
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
 
 db.init_app(app)
-bcrypt.init_app(app) 
+replica_router = ReplicaRouter(app, db)
+migrate = Migrate(app, db)
+request_metrics = RequestMetrics(app)
+
+champion_fragments = make_cache(app.config['CACHE_URL'], 'lol-dex:fragments:', maxsize=CHAMPION_FRAGMENT_CACHE_SIZE)
+page_cache = make_cache(app.config['CACHE_URL'], 'lol-dex:pages:', maxsize=PAGE_CACHE_SIZE)
+request_metrics.counter('champion_fragment_cache_hits_total', 'Champion page fragment cache hits.', lambda: champion_fragments.hits)
+request_metrics.counter('champion_fragment_cache_misses_total', 'Champion page fragment cache misses.', lambda: champion_fragments.misses)
+request_metrics.counter('page_cache_hits_total', 'Anonymous page cache hits.', lambda: page_cache.hits)
+request_metrics.counter('page_cache_misses_total', 'Anonymous page cache misses.', lambda: page_cache.misses)
+request_metrics.counter('champion_catalog_hits_total', 'Champion catalog cache hits.', lambda: champion_catalog.hits)
+request_metrics.counter('champion_catalog_misses_total', 'Champion catalog rebuilds.', lambda: champion_catalog.misses)
 
 #########################################################################
 # Get API data to populate database, call command `flask seeddb` in Terminal to initialize
-def get_profile_icons():
-    response = requests.get(f'{API_URL}/data/en_US/profileicon.json')
-    profile_icons = response.json()['data']
+def get_data_source(path=None, concurrency=DEFAULT_CONCURRENCY):
+    """Return the live Data Dragon CDN, or an offline dragontail snapshot if a path is given"""
+    if path:
+        return open_source(path)
+    return HttpSource(API_URL, concurrency=concurrency, version=DDRAGON_VERSION)
+
+def get_profile_icons(source=None):
+    source = source or get_data_source()
+    profile_icons = source.profile_icons()
     return profile_icons
 
-def get_champion_data():
+def get_champion_data(source=None):
+    source = source or get_data_source()
     try:
-        # Fetch the list of all champions
-        response = requests.get(f'{API_URL}/data/en_US/champion.json')
-        champion_list = response.json()['data']
-
-        # Fetch detailed data for each champion
-        champions_data = {}
-        for champion_name, _ in champion_list.items():
-            response = requests.get(f'{API_URL}/data/en_US/champion/{champion_name}.json')
-            champions_data[champion_name] = response.json()['data'][champion_name]
-        
-        return champions_data
+        return source.champion_data()
     except Exception as err:
         print(f"An error occurred while fetching data from Riot API: {err}")
 
 
-def populate_champions():
-    champions_data = get_champion_data()
+def build_champion_fields(info, api_url=API_URL):
+    """Map Data Dragon champion JSON to Champion column values"""
+    image_url = f"https://ddragon.leagueoflegends.com/cdn/img/champion/splash/{info['id']}_0.jpg"
+    description = info.get('lore', info.get('blurb', 'No description available'))
+
+    difficulty = info.get('info', {}).get('difficulty')
+
+    skins = info.get('skins', [])
+    for skin in skins:
+        skin_url = f"http://ddragon.leagueoflegends.com/cdn/img/champion/splash/{info['id']}_{skin.get('num', '0')}.jpg"
+        skin['url'] = skin_url
+
+    abilities = info.get('spells', [])
+    for ability in abilities:
+        ability_image = ability.get('image', {})
+        ability_image_url = f"{api_url}/img/{ability_image.get('group', '')}/{ability_image.get('full', '')}"
+        ability['image_url'] = ability_image_url
+
+    passive = info.get('passive', {})
+    passive_image = passive.get('image', {})
+    passive_image_url = f"{api_url}/img/{passive_image.get('group', '')}/{passive_image.get('full', '')}"
+    passive['image_url'] = passive_image_url
+
+    return dict(tags=info['tags'], image_url=image_url,
+                description=description, title=info.get('title', ''),
+                difficulty=difficulty, abilities=abilities, passive=passive,
+                allytips=info.get('allytips'), enemytips=info.get('enemytips'),
+                skins=skins)
+
+def content_hash(fields):
+    """Stable hash of a champion's column values, used to skip unchanged rows"""
+    payload = json.dumps(fields, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def chunked(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def populate_champions(source=None, batch_size=SEED_BATCH_SIZE):
+    """Insert new champions and update changed ones.
+
+    Existing champions are loaded in a single query, then new and changed rows
+    are written with bulk INSERT/UPDATE statements in batches, each with its
+    champion_tags rows. Everything, including the new seed revision, is
+    committed once at the end, so a failed seed leaves nothing behind and a
+    rerun sees the same changes. Errors are re-raised after the rollback.
+    Returns a dict with the number of added, changed and unchanged champions.
+    """
+    counts = {'added': 0, 'changed': 0, 'unchanged': 0}
+    source = source or get_data_source()
+    champions_data = get_champion_data(source)
+    if not champions_data:
+        return counts
+    version = source.version or DDRAGON_VERSION
+    api_url = f"{DDRAGON_URL}/cdn/{version}"
+
+    existing = {row.name: row for row in db.session.execute(
+        db.select(Champion.id, Champion.name, Champion.content_hash))}
+
+    inserts, updates, tags = [], [], {}
+    names = {row.id: name for name, row in existing.items()}
     for champion_name, info in champions_data.items():
-        image_url = f"https://ddragon.leagueoflegends.com/cdn/img/champion/splash/{info['id']}_0.jpg"
-        champion = Champion.query.filter_by(name=champion_name).first()
-        description = info.get('lore', info.get('blurb', 'No description available'))
-       
-        difficulty = info.get('info', {}).get('difficulty')  
-
-        skins = info.get('skins', [])                      
-        for skin in skins:
-            skin_url = f"http://ddragon.leagueoflegends.com/cdn/img/champion/splash/{info['id']}_{skin.get('num', '0')}.jpg"
-            skin['url'] = skin_url
-        
-        abilities = info.get('spells', [])                      
-        for ability in abilities:
-            ability_image = ability.get('image', {})
-            ability_image_url = f"{API_URL}/img/{ability_image.get('group', '')}/{ability_image.get('full', '')}"
-            ability['image_url'] = ability_image_url
-        
-        passive = info.get('passive', {})
-        passive_image = passive.get('image', {})
-        passive_image_url = f"{API_URL}/img/{passive_image.get('group', '')}/{passive_image.get('full', '')}"
-        passive['image_url'] = passive_image_url
-        info['passive'] = passive
-
-        allytips = info.get('allytips')                      
-        enemytips = info.get('enemytips')                    
-
-        if champion:
-            champion.role = info['tags'][0]
-            champion.tags = info['tags']
-            champion.image_url = image_url
-            champion.description = description
-            champion.title = info.get('title', '')
-            champion.difficulty = difficulty
-            champion.abilities = abilities
-            champion.passive = info.get('passive')
-            champion.allytips = allytips
-            champion.enemytips = enemytips
-            champion.skins = skins
+        fields = build_champion_fields(info, api_url)
+        fields_hash = content_hash(fields)
+        # Tags live in their own table
+        tags[champion_name] = fields.pop('tags')
+        current = existing.get(champion_name)
+
+        if current is None:
+            inserts.append(dict(name=champion_name, content_hash=fields_hash, **fields))
+        elif current.content_hash == fields_hash:
+            counts['unchanged'] += 1
         else:
-            champion = Champion(name=champion_name, role=info['tags'][0], tags=info['tags'],
-                                image_url=image_url, description=description,
-                                title=info.get('title', ''), difficulty=difficulty,
-                                abilities=abilities, passive=info.get('passive'),
-                                allytips=allytips, enemytips=enemytips, skins=skins)
-            db.session.add(champion)
+            updates.append(dict(id=current.id, content_hash=fields_hash, **fields))
+            champion_fragments.delete(fragment_key(champion_name, current.content_hash))
+
     try:
+        for batch in chunked(inserts, batch_size):
+            inserted = db.session.execute(insert(Champion).returning(Champion.id, Champion.name), batch)
+            ChampionTag.replace({row.id: tags[row.name] for row in inserted})
+            counts['added'] += len(batch)
+        for batch in chunked(updates, batch_size):
+            db.session.execute(update(Champion), batch)
+            ChampionTag.replace({row['id']: tags[names[row['id']]] for row in batch})
+            counts['changed'] += len(batch)
+        Tag.refresh()
+        SeedVersion.record(version, changed=bool(inserts or updates))
         db.session.commit()
     except Exception as e:
         print(f"An error occurred while updating the champions: {e}")
         db.session.rollback()
+        raise
+    champion_catalog.invalidate()
 
-def seed_database():
+    try:
+        write_champion_bundle(SeedVersion.latest())
+    except OSError as e:
+        # The seed itself succeeded; /bundles builds the file on first request
+        print(f"Could not write the champion bundle: {e}")
+    return counts
+
+def write_champion_bundle(revision):
+    """Write the static champions-<patch>-<revision>.json bundle from the catalog"""
+    catalog = champion_catalog.get(revision.id)
+    return write_bundle(app.config['CHAMPION_BUNDLE_DIR'], revision.version, revision.id, catalog.champions)
+
+def seed_database(source=None):
     with app.app_context():
         db.create_all()  
-        populate_champions()  
+        return populate_champions(source)  
 
 @app.cli.command("seeddb")
-def seed_database_command():
+@click.option('--concurrency', default=DEFAULT_CONCURRENCY, show_default=True,
+              help='Number of parallel Data Dragon requests.')
+@click.option('--from', 'source_path', type=click.Path(exists=True),
+              help='Seed from a dragontail-<version>.tgz archive or extracted directory.')
+def seed_database_command(concurrency, source_path):
     """Seeds the database."""
-    seed_database()
-    print("Seeded the database.")
+    source = get_data_source(source_path, concurrency=concurrency)
+    counts = seed_database(source)
+    print(f"Seeded the database with patch {source.version or DDRAGON_VERSION}: "
+          f"{counts['added']} added, {counts['changed']} changed, {counts['unchanged']} unchanged.")
+
+@app.cli.command("assets")
+def build_assets_command():
+    """Fingerprints and precompresses static assets."""
+    builder = AssetBuilder(app.static_folder, app.config['ASSETS_DIR'], '/assets')
+    manifest = builder.build()
+    if not builder.woff2:
+        print("fontTools/brotli not installed: fonts were fingerprinted as TTF, not WOFF2.")
+    print(f"Built {len(manifest)} assets into {app.config['ASSETS_DIR']}.")
 
 ###########################################################################
 # User signup/login/logout 
+class CurrentUser:
+    """The logged-in user, loaded from the database only when needed.
+
+    `id`, `username` and `image_url` come from the signed session cookie, so
+    the nav bar and most routes never query the users table. Any other
+    attribute loads the User row on first access. If the row has been deleted
+    since login, the session is logged out and the request is retried
+    anonymously (GET) or rejected with a 401.
+    """
+
+    def __init__(self, user_id, claims=None):
+        self.id = user_id
+        self._claims = claims or {}
+        self._user = None
+        self._missing = False
+
+    def __bool__(self):
+        return not self._missing
+
+    def __getattr__(self, name):
+        if name in self._claims:
+            return self._claims[name]
+        return getattr(self.load(), name)
+
+    def load(self):
+        """Return the User row, logging the session out if it was deleted"""
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+            if self._user is None:
+                self._missing = True
+                session.pop(CURR_USER_KEY, None)
+                session.pop(CURR_USER_CLAIMS_KEY, None)
+                abort(redirect(request.url) if request.method in ('GET', 'HEAD') else 401)
+        return self._user
+
+def user_claims(user):
+    return {'username': user.username, 'image_url': user.image_url}
+
 @app.before_request
 def add_user_to_g():
     """If we're logged in, add curr user to Flask global."""
     if CURR_USER_KEY in session:
-        g.user = User.query.get(session[CURR_USER_KEY])
+        g.user = CurrentUser(session[CURR_USER_KEY], session.get(CURR_USER_CLAIMS_KEY))
     else:
         g.user = None
 
@@ -126,18 +284,24 @@ def do_login(user):
     """Log in user."""
 
     session[CURR_USER_KEY] = user.id
+    session[CURR_USER_CLAIMS_KEY] = user_claims(user)
     flash(f"Hello, {user.username}!", "success")
 
 def do_logout():
     """Logout user."""
 
+    session.pop(CURR_USER_CLAIMS_KEY, None)
     if CURR_USER_KEY in session:
         del session[CURR_USER_KEY]
         flash("You have been successfully logged out.", "info")
 
 @app.route('/signup', methods=["GET", "POST"])
 def signup():
-    """Handle user signup."""
+    """Handle user signup.
+
+    Taken usernames and emails are caught by the unique constraints on the
+    INSERT itself rather than looked up first, so a signup is one roundtrip.
+    """
     form = SignupForm()
     if form.validate_on_submit():
         try:
@@ -146,14 +310,19 @@ def signup():
                 password=form.password.data,
                 email=form.email.data,
             )
-            db.session.commit()
+            db.session.flush()
 
-        except IntegrityError:
-            flash("Username already taken", 'danger')
+        except IntegrityError as e:
+            db.session.rollback()
+            if not form.add_unique_error(e):
+                flash("An error occurred while creating the user. Please try again.", 'danger')
             return render_template('signup.html', form=form)
 
         flash('New user has been created!', 'primary')
+        # Log in before the commit expires the new user, or reading its
+        # claims back would cost another SELECT
         do_login(user)
+        db.session.commit()
 
         return redirect("/")
 
@@ -171,6 +340,8 @@ def login():
                                  form.password.data)
 
         if user:
+            # Persists a rehashed password if the work factor changed
+            db.session.commit()
             do_login(user)
             return redirect("/")
 
@@ -185,16 +356,106 @@ def logout():
     do_logout()
     return redirect('/')
 
+###########################################################################
+# HTTP caching
+def cached_response(etag, last_modified, render, key_args=()):
+    """Serve `render()` with validators so repeat anonymous visits get a 304.
+
+    Pages for logged-in users (favorite state, nav) or with pending flash
+    messages are personalized and marked private; they never get validators
+    that a shared cache could reuse. Without an etag (an unseeded database)
+    the response is always rendered fresh.
+
+    Anonymous 200 pages are also kept in `page_cache`, keyed by endpoint, URL
+    arguments, etag and last-modified time, so a reseed moves every worker to
+    new keys at once. Query strings are not part of the key: a view that reads
+    query args passes the parsed values it uses as `key_args`, so junk
+    parameters can't add entries.
+    """
+    if g.user or session.get('_flashes') or etag is None:
+        response = make_response(render())
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = app.response_class(status=304)
+    else:
+        rendered = []
+
+        def render_page():
+            response = make_response(render())
+            rendered.append(response)
+            if response.status_code == 200:
+                return response.get_data(), response.mimetype
+            return None
+
+        url_args = sorted((request.view_args or {}).items())
+        key = f"{request.endpoint}|{url_args}|{list(key_args)}|{etag}|{last_modified and last_modified.isoformat()}"
+        page = page_cache.get_or_set(key, render_page, timeout=PAGE_CACHE_TIMEOUT)
+        if page is None:
+            return rendered[0]
+        response = rendered[0] if rendered else app.response_class(page[0], mimetype=page[1])
+
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Browsers revalidate every time; a CDN/reverse proxy may reuse the page briefly
+    response.cache_control.public = True
+    response.cache_control.max_age = 0
+    response.cache_control.s_maxage = SHARED_CACHE_MAX_AGE
+    return response
+
+def champion_bundle_url(revision):
+    """URL of the champion bundle for a seed revision, or None if never seeded.
+
+    The revision id is part of the file name, so the bundle itself can be
+    cached forever.
+    """
+    if revision is None:
+        return None
+    return url_for('champion_bundle', name=bundle_name(revision.version, revision.id))
+
+def send_precompressed(directory, name):
+    """Serve `name` or its smallest precompressed variant, cached forever.
+
+    Only for fingerprinted or versioned URLs whose content never changes.
+    """
+    path, encoding = find_variant(directory, name, request.accept_encodings)
+    if path is None:
+        abort(404)
+
+    response = send_file(path, mimetype=mimetypes.guess_type(name)[0], max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.template_global()
+def asset_url(name):
+    """Fingerprinted URL of a static file from `flask assets`, or its plain static URL"""
+    hashed = load_manifest(app.config['ASSETS_DIR']).get(name)
+    if hashed is None:
+        return url_for('static', filename=name)
+    return url_for('asset', filename=hashed)
+
+def revision_etag(revision, *parts):
+    """ETag for content derived from a seed revision, or None if never seeded"""
+    if revision is None:
+        return None
+    return '-'.join([revision.version, str(revision.id), *map(str, parts)])
+
 ###########################################################################
 # User routes
 @app.route('/profile/<string:username>', methods=["GET"])
+@read_only
 def profile(username):
     """Show user profile"""
     user = User.query.filter_by(username=username).first()
     if user is None:
         return render_template('404.html'), 404
-    favorites = Favorite.query.filter_by(user_id=user.id).all()
-    return render_template('profile.html', user=user, favorites=favorites)
+    return render_template('profile.html', user=user)
 
 @app.route('/profile/<string:username>/edit', methods=["GET", "POST"])
 def edit_profile(username):
@@ -213,88 +474,210 @@ def edit_profile(username):
         user.bio = form.bio.data or user.bio
         user.summoner_name = form.summoner_name.data or user.summoner_name
         db.session.commit()
+        session[CURR_USER_CLAIMS_KEY] = user_claims(user)
         flash('Profile has been updated!', 'primary')   
         return redirect(url_for('profile', username=username)) 
 
     return render_template('edit_profile.html', form=form, user=user)
 
+def paginate_favorites(user_id):
+    """Return a page of a user's favorites (newest first) and the cursor for the next page.
+
+    Champions are joined in the same query, and pages are keyed on the last
+    favorite id seen rather than an OFFSET.
+    """
+    query = (Favorite.query.filter_by(user_id=user_id)
+             .options(db.joinedload(Favorite.champion))
+             .order_by(Favorite.id.desc()))
+    before = request.args.get('before')
+    if before:
+        try:
+            query = query.filter(Favorite.id < int(before))
+        except ValueError:
+            abort(400)
+
+    favorites = query.limit(LISTING_PAGE_SIZE + 1).all()
+    next_cursor = str(favorites[LISTING_PAGE_SIZE - 1].id) if len(favorites) > LISTING_PAGE_SIZE else None
+    return favorites[:LISTING_PAGE_SIZE], next_cursor
+
+def comment_cursor(comment):
+    return f"{comment.date.isoformat()},{comment.id}"
+
+def paginate_comments(query, page_size=None):
+    """Return a page of comments (newest first) and the cursor for the next page.
+
+    Pages are keyed on the (date, id) of the last comment seen, so deep pages
+    cost the same as the first one.
+    """
+    page_size = page_size or LISTING_PAGE_SIZE
+    before = request.args.get('before')
+    if before:
+        date, _, comment_id = before.rpartition(',')
+        try:
+            query = query.filter(tuple_(Comment.date, Comment.id) <
+                                 tuple_(datetime.fromisoformat(date), int(comment_id)))
+        except ValueError:
+            abort(400)
+
+    comments = query.order_by(Comment.date.desc(), Comment.id.desc()).limit(page_size + 1).all()
+    next_cursor = comment_cursor(comments[page_size - 1]) if len(comments) > page_size else None
+    return comments[:page_size], next_cursor
+
+def user_comments(user_id):
+    query = (Comment.query.filter_by(user_id=user_id)
+             .options(db.joinedload(Comment.user), db.joinedload(Comment.champion)))
+    return paginate_comments(query)
+
 @app.route('/favorites')
+@read_only
 def favorites():
     """Show user's favorite champions (current user)"""
     if g.user is None:
         flash("You must be logged in to view your favorites.", "info")
         return redirect('/')
     
-    favorites = Favorite.query.filter_by(user_id=g.user.id).all()
-    return render_template('favorites.html', favorites=favorites)
+    favorites, next_cursor = paginate_favorites(g.user.id)
+    return render_template('favorites.html', favorites=favorites, next_cursor=next_cursor)
 
 @app.route('/profile/<string:username>/favorites', methods=["GET"])
+@read_only
 def profile_favorites(username):
     """Show user's favorite champions (another user)"""
     user = User.query.filter_by(username=username).first()
     if user is None:
         return render_template('404.html'), 404
-    favorites = Favorite.query.filter_by(user_id=user.id).all()
-    return render_template('favorites.html', favorites=favorites)
+    favorites, next_cursor = paginate_favorites(user.id)
+    return render_template('favorites.html', favorites=favorites, next_cursor=next_cursor)
 
 @app.route('/comments', methods=["GET"])
+@read_only
 def my_comments():
     """Show current user's comments (current user)"""
     if g.user is None:
         flash("You must be logged in to view your comments.", "info")
         return redirect('/')
     
-    comments = Comment.query.filter_by(user_id=g.user.id).all()
-    return render_template('comments.html', comments=comments)
+    comments, next_cursor = user_comments(g.user.id)
+    return render_template('comments.html', comments=comments, next_cursor=next_cursor)
 
 @app.route('/profile/<string:username>/comments', methods=["GET"])
+@read_only
 def profile_comments(username):
     """Show a user's comments (another user)"""
     user = User.query.filter_by(username=username).first()
     if user is None:
         return render_template('404.html'), 404
-    comments = Comment.query.filter_by(user_id=user.id).all()
-    return render_template('comments.html', comments=comments, username=username)
+    comments, next_cursor = user_comments(user.id)
+    return render_template('comments.html', comments=comments, username=username, next_cursor=next_cursor)
 
 #########################################################################
 # Champion detail, favoriting, commenting 
+CHAMPION_FRAGMENTS = ('header', 'details', 'tips', 'skins')
+COMMENT_PAGE_SIZE = 10
+
+def render_champion_fragments(champion):
+    """Render the static parts of the champion page.
+
+    Fragments are cached per (name, content hash), so they are rendered once per
+    seeded payload; champions that were never seeded are always rendered fresh.
+    """
+    def render():
+        return {fragment: get_template_attribute('champion_fragments.html', fragment)(champion)
+                for fragment in CHAMPION_FRAGMENTS}
+
+    if not champion.content_hash:
+        return render()
+    return champion_fragments.get_or_set(fragment_key(champion.name, champion.content_hash), render)
+
+def fragment_key(name, content_hash):
+    return f"{name}:{content_hash}"
+
+def champion_comments(champion_id):
+    """Return a page of a champion's comments (newest first) with their authors joined"""
+    query = Comment.query.filter_by(champion_id=champion_id).options(db.joinedload(Comment.user))
+    return paginate_comments(query, page_size=COMMENT_PAGE_SIZE)
+
 @app.route('/champion/<string:name>')
+@read_only
 def champion(name):
     """Show champion detail page"""
-    champion = Champion.query.filter_by(name=name).first()
-    difficulty_percentage = champion.difficulty * 10
-    form = CommentForm()
+    champion = Champion.query.options(db.undefer(Champion.content_hash)).filter_by(name=name).first()
     if champion is None:
         return render_template('404.html'), 404
-    
-    is_favorited = False
-    if g.user:
-        favorite = Favorite.query.filter_by(user_id=g.user.id, champion_id=champion.id).first()
-        if favorite:
-            is_favorited = True
-
-    return render_template('champion.html', champion=champion, is_favorited=is_favorited, form=form, difficulty_percentage=difficulty_percentage)
 
-
-@app.route('/favorite/<int:champion_id>', methods=["POST"])
+    revision = SeedVersion.latest()
+    comment_count, last_comment_id, last_comment = db.session.execute(
+        db.select(db.func.count(Comment.id), db.func.max(Comment.id), db.func.max(Comment.date))
+        .filter(Comment.champion_id == champion.id)).one()
+    etag = None
+    if champion.content_hash:
+        etag = revision_etag(revision, champion.content_hash[:16], comment_count, last_comment_id)
+    last_modified = max(filter(None, [revision and revision.seeded_at, last_comment]), default=None)
+
+    def render():
+        fragments = render_champion_fragments(champion)
+        comments, next_cursor = champion_comments(champion.id)
+        form = CommentForm()
+        
+        is_favorited = False
+        if g.user:
+            favorite = Favorite.query.filter_by(user_id=g.user.id, champion_id=champion.id).first()
+            if favorite:
+                is_favorited = True
+
+        return render_template('champion.html', champion=champion, fragments=fragments, is_favorited=is_favorited, form=form,
+                               comments=comments, comment_count=comment_count, next_cursor=next_cursor)
+
+    return cached_response(etag, last_modified, render)
+
+
+@app.route('/champion/<string:name>/comments')
+@read_only
+def champion_comment_page(name):
+    """JSON page of a champion's comments, newest first; pass `before` to get older ones"""
+    champion_id = db.session.execute(db.select(Champion.id).filter_by(name=name)).scalar()
+    if champion_id is None:
+        return jsonify({'message': 'Champion not found'}), 404
+
+    comments, next_cursor = champion_comments(champion_id)
+    return jsonify({
+        'comments': [{'id': comment.id,
+                      'content': comment.content,
+                      'date': comment.date.strftime('%Y-%m-%d'),
+                      'username': comment.user.username,
+                      'profile_url': url_for('profile', username=comment.user.username)}
+                     for comment in comments],
+        'next_cursor': next_cursor,
+    })
+
+
+@app.route('/favorite/<int:champion_id>', methods=["POST", "PUT", "DELETE"])
 def favorite_champion(champion_id):
-    """Add/remove favorite champion for current user"""
+    """Add/remove favorite champion for current user.
+
+    POST toggles the favorite; PUT and DELETE set it explicitly and are safe
+    to retry.
+    """
     if g.user is None:
         return jsonify({'message': 'User not authenticated', 'is_authenticated': False}), 401
 
-    champion = Champion.query.get_or_404(champion_id)
-
-    favorite = Favorite.query.filter_by(user_id=g.user.id, champion_id=champion.id).first()
-
-    if favorite:
-        db.session.delete(favorite)
+    try:
+        if request.method == 'PUT':
+            Favorite.add(g.user.id, champion_id)
+            is_favorited = True
+        elif request.method == 'DELETE':
+            Favorite.remove(g.user.id, champion_id)
+            is_favorited = False
+        else:
+            is_favorited = Favorite.toggle(g.user.id, champion_id)
         db.session.commit()
-        return jsonify({'is_favorited': False, 'is_authenticated': True})
+    except IntegrityError:
+        # Either the user (deleted since login: 401) or the champion (404) does not exist
+        db.session.rollback()
+        g.user.load()
+        abort(404)
 
-    favorite = Favorite(user_id=g.user.id, champion_id=champion.id)
-    db.session.add(favorite)
-    db.session.commit()
-    return jsonify({'is_favorited': True, 'is_authenticated': True})
+    return jsonify({'is_favorited': is_favorited, 'is_authenticated': True})
 
 
 @app.route('/champion/<string:name>/comment', methods=['POST'])
@@ -321,29 +704,118 @@ def comment(name):
 ###########################################################################
 # Homepage and other routes
 @app.route('/')
+@read_only
 def homepage():
-    """Show homepage"""
-    champions = Champion.query.all() 
-    
-    return render_template('home.html', champions=champions) 
+    """Show homepage.
+
+    Once seeded, the carousels are rendered in the browser from the champion
+    bundle; before that they are rendered here.
+    """
+    revision = SeedVersion.latest()
+
+    def render():
+        if revision is not None:
+            return render_template('home.html', bundle_url=champion_bundle_url(revision))
+        catalog = champion_catalog.get()
+        return render_template('home.html', champions=catalog.champions, champions_by_tag=catalog.by_tag)
+
+    return cached_response(revision_etag(revision), revision and revision.seeded_at, render)
 
 
 @app.route('/search')
+@read_only
 def search():
-    """Search for champion by name"""
+    """Search for champions by name or title, best matches first"""
     query = request.args.get('q')
     if not query:
         return jsonify([])
-    champions = Champion.query.filter(Champion.name.ilike(f'%{query}%')).all()
-    return jsonify([champion.name for champion in champions])
+    limit = max(1, min(request.args.get('limit', DEFAULT_SEARCH_LIMIT, type=int), MAX_SEARCH_LIMIT))
+    revision = SeedVersion.latest()
+
+    def render():
+        champions = champion_catalog.get(revision and revision.id).search_index.search(query, limit)
+        return jsonify([champion.name for champion in champions])
+
+    return cached_response(revision_etag(revision), revision and revision.seeded_at, render, key_args=(query, limit))
+
+@app.route('/bundles/<string:name>')
+@read_only
+def champion_bundle(name):
+    """Serve a precompressed champions-<patch>-<revision>.json bundle.
+
+    `flask seeddb` writes it on the host it runs on; any other host builds the
+    latest revision's bundle from the catalog on first request.
+    """
+    if not BUNDLE_NAME.fullmatch(name):
+        abort(404)
+    directory = app.config['CHAMPION_BUNDLE_DIR']
+    if not os.path.exists(os.path.join(directory, name)):
+        revision = SeedVersion.latest()
+        if revision is None or name != bundle_name(revision.version, revision.id):
+            abort(404)
+        write_champion_bundle(revision)
+    return send_precompressed(directory, name)
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """Serve a fingerprinted static asset built by `flask assets`"""
+    # Only fingerprinted names are immutable; the manifest is rewritten by every build
+    if not is_fingerprinted(filename) or safe_join(app.config['ASSETS_DIR'], filename) is None:
+        abort(404)
+    return send_precompressed(app.config['ASSETS_DIR'], filename)
+
+@app.route('/images/<string:variant>/<path:path>')
+def image(variant, path):
+    """Serve a resized Data Dragon image from the local image cache"""
+    if variant not in IMAGE_VARIANTS or not IMAGE_PATH.fullmatch(path):
+        abort(404)
+    try:
+        file_path = cached_image(app.config['IMAGE_CACHE_DIR'], app.config['IMAGE_ORIGIN'], variant, path)
+    except requests.HTTPError as e:
+        abort(404 if e.response.status_code == 404 else 502)
+    except (requests.RequestException, OSError) as e:
+        print(f"Could not cache image {path}: {e}")
+        abort(502)
+
+    response = send_file(file_path, max_age=IMAGE_MAX_AGE)
+    response.cache_control.public = True
+    return response
+
+@app.route('/tags')
+@read_only
+def tags():
+    """List tags with the number of champions in each"""
+    revision = SeedVersion.latest()
+
+    def render():
+        return jsonify([{'name': tag.name, 'count': tag.champion_count, 'url': url_for('tag', tag_name=tag.name)}
+                        for tag in Tag.query.order_by(Tag.name)])
+
+    return cached_response(revision_etag(revision), revision and revision.seeded_at, render)
 
 @app.route('/tag/<string:tag_name>')
+@read_only
 def tag(tag_name):
-    """Show all champions with a specific tag."""
-    champions = Champion.query.filter(Champion.tags.any(tag_name)).all()
-    if not champions:
-        return render_template('404.html'), 404
-    return render_template('tag.html', champions=champions, tag=tag_name)
+    """Show all champions with a specific tag, from its materialized champion id list."""
+    revision = SeedVersion.latest()
+
+    def render():
+        tag = db.session.get(Tag, tag_name)
+        by_id = champion_catalog.get(revision and revision.id).by_id
+        champions = [by_id[champion_id] for champion_id in tag.champion_ids if champion_id in by_id] if tag else None
+        if not champions:
+            return render_template('404.html'), 404
+        return render_template('tag.html', champions=champions, tag=tag_name)
+
+    return cached_response(revision_etag(revision), revision and revision.seeded_at, render)
+
+@app.route('/metrics')
+def metrics():
+    """Request, SQL and template metrics of this worker in the Prometheus text format.
+
+    Only loopback clients may scrape it unless METRICS_TOKEN is set.
+    """
+    return request_metrics.response()
 
 @app.errorhandler(404)
 def page_not_found(e):
@@ -357,12 +829,14 @@ def slugify(s):
 
 app.jinja_env.filters['slugify'] = slugify
 
+def resized(url, variant):
+    """Route a Data Dragon image URL through the local image cache; leave others as is"""
+    path = cdn_path(url)
+    if path is None:
+        return url
+    return url_for('image', variant=variant, path=path)
 
-def contains(container, value):
-    """For multiple carousel use on homepage"""
-    return value in container
-
-app.jinja_env.tests['contains'] = contains
+app.jinja_env.filters['resized'] = resized
 
 
 if __name__ == '__main__':
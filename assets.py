@@ -0,0 +1,129 @@
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import re
+from functools import lru_cache
+from bundle import brotli, compress, write_file
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:  # fontTools is optional; without it fonts are fingerprinted as TTF
+    font_subset = None
+
+mimetypes.add_type('font/woff2', '.woff2')
+
+# Entry points; fonts are picked up from the url() references in the CSS
+ASSET_FILES = ('darkly.css', 'style.css', 'app.js')
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = ('.css', '.js', '.ttf', '.svg')
+
+# Latin, Latin-1 and common punctuation cover every champion name and page string
+FONT_UNICODES = [*range(0x20, 0x7f), *range(0xa0, 0x100), *range(0x2010, 0x2027), 0x20ac, 0x2122]
+
+# Names written by fingerprint(); anything else in the build dir (the manifest) may change
+FINGERPRINTED = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+STATIC_URL = re.compile(r"""url\((["']?)/static/([^"')?#]+)\1\)(\s*format\((["'])truetype\4\))?""")
+
+
+def fingerprint(name, data):
+    """'fonts/Spiegel.ttf' -> 'fonts/Spiegel.<hash>.ttf'"""
+    root, ext = os.path.splitext(name)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def is_fingerprinted(name):
+    return FINGERPRINTED.search(name) is not None
+
+
+def woff2_subset(path):
+    options = font_subset.Options()
+    options.flavor = 'woff2'
+    options.layout_features = ['*']
+    font = font_subset.load_font(path, options)
+    subsetter = font_subset.Subsetter(options)
+    subsetter.populate(unicodes=FONT_UNICODES)
+    subsetter.subset(font)
+    buffer = io.BytesIO()
+    font_subset.save_font(font, buffer, options)
+    return buffer.getvalue()
+
+
+class AssetBuilder:
+    """Fingerprint static files into `out_dir` and record them in a manifest.
+
+    CSS is rewritten to point at the fingerprinted files it references; TTF
+    fonts are converted to Latin WOFF2 subsets when fontTools and brotli are
+    installed. Compressible outputs get precompressed .gz (and .br) siblings.
+    Files from earlier builds are kept so cached pages still find them.
+    """
+
+    def __init__(self, static_dir, out_dir, url_prefix):
+        self.static_dir = static_dir
+        self.out_dir = out_dir
+        self.url_prefix = url_prefix.rstrip('/')
+        self.woff2 = font_subset is not None and brotli is not None
+        self.manifest = {}
+
+    def build(self, names=ASSET_FILES):
+        for name in names:
+            self.add(name)
+        write_file(os.path.join(self.out_dir, MANIFEST),
+                   json.dumps(self.manifest, indent=2, sort_keys=True).encode('utf-8'))
+        return self.manifest
+
+    def add(self, name):
+        """Build one static file (once) and return its fingerprinted name"""
+        if name in self.manifest:
+            return self.manifest[name]
+
+        path = os.path.join(self.static_dir, name)
+        out_name = name
+        if name.endswith('.css'):
+            with open(path, encoding='utf-8') as f:
+                data = self.rewrite_css(f.read()).encode('utf-8')
+        elif name.endswith('.ttf') and self.woff2:
+            data = woff2_subset(path)
+            out_name = os.path.splitext(name)[0] + '.woff2'
+        else:
+            with open(path, 'rb') as f:
+                data = f.read()
+
+        hashed = fingerprint(out_name, data)
+        out_path = os.path.join(self.out_dir, hashed)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        write_file(out_path, data)
+        if hashed.endswith(COMPRESSIBLE):
+            write_file(out_path + '.gz', compress(data, 'gzip'))
+            if brotli is not None:
+                write_file(out_path + '.br', compress(data, 'br'))
+
+        self.manifest[name] = hashed
+        return hashed
+
+    def rewrite_css(self, css):
+        def replace(match):
+            hashed = self.add(match.group(2))
+            url = f'url("{self.url_prefix}/{hashed}")'
+            if match.group(3):
+                url += ' format("woff2")' if hashed.endswith('.woff2') else match.group(3)
+            return url
+
+        return STATIC_URL.sub(replace, css)
+
+
+@lru_cache(maxsize=8)
+def read_manifest(path, mtime):
+    with open(path) as f:
+        return json.load(f)
+
+
+def load_manifest(out_dir):
+    """The latest build's manifest, re-read only when the file changes"""
+    path = os.path.join(out_dir, MANIFEST)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    return read_manifest(path, mtime)
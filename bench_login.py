@@ -0,0 +1,41 @@
+"""Login throughput of a single worker at different bcrypt cost factors.
+
+    python bench_login.py --rounds 10 11 12 13 --threads 4 --logins 40
+
+Each request thread verifies a password under the concurrency limit in
+passwords.py, as User.authenticate does, so the numbers show how many logins
+per second one worker process can serve at each work factor.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from passwords import hash_password, check_password
+
+
+def bench(rounds, threads, logins):
+    hashed = hash_password("Abcdefg123!", rounds=rounds)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as request_threads:
+        results = list(request_threads.map(lambda _: check_password(hashed, "Abcdefg123!"), range(logins)))
+    elapsed = time.perf_counter() - start
+
+    assert all(results)
+    return logins / elapsed, elapsed / logins
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, nargs='+', default=[10, 11, 12, 13])
+    parser.add_argument('--threads', type=int, default=4, help='request threads per worker')
+    parser.add_argument('--logins', type=int, default=40, help='logins per cost factor')
+    args = parser.parse_args()
+
+    print(f"{'rounds':>6} {'logins/s':>10} {'ms/login':>10}")
+    for rounds in args.rounds:
+        throughput, latency = bench(rounds, args.threads, args.logins)
+        print(f"{rounds:>6} {throughput:>10.1f} {latency * 1000:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
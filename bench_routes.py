@@ -0,0 +1,290 @@
+"""Throughput and latency benchmark for the core routes.
+
+    python bench_routes.py --champions 170 --users 200 --favorites 2000 --comments 5000 \\
+        --output bench.json
+    python bench_routes.py --compare bench.json          # exit 1 on a regression
+    SQLALCHEMY_DATABASE_URI=sqlite:// python bench_routes.py    # no database server needed
+
+Seeds a synthetic dataset (dropping all tables first, so it only runs against
+in-memory SQLite or a database whose name contains "test" or "bench"), then drives each route
+through the Flask test client and a local threaded WSGI server. For every
+route it reports p50/p99 latency, requests/s and SQL statements per request.
+
+Results are written as JSON with sorted keys so they diff cleanly between
+commits. With --compare, a route regresses if it now runs more queries per
+request, or if its p50 latency grew by more than --tolerance.
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import requests
+from sqlalchemy import insert
+from werkzeug.serving import WSGIRequestHandler, make_server
+from database import db
+from models import Champion, ChampionTag, Tag, User, Favorite, Comment, SeedVersion
+from passwords import hash_password
+from app import app, request_metrics, build_champion_fields, content_hash, DDRAGON_VERSION
+
+PASSWORD = "bench-password"
+TAGS = ["Assassin", "Fighter", "Mage", "Marksman", "Support", "Tank"]
+SYLLABLES = ["ka", "ra", "zed", "lu", "an", "mor", "shi", "vel", "tar", "io", "gal", "ne", "sy", "dra", "kin"]
+
+# name -> (method, url for the i-th request, needs a logged-in user)
+ROUTES = {
+    'home': ('GET', lambda data, i: "/", False),
+    'champion': ('GET', lambda data, i: f"/champion/{data.champion(i)}", False),
+    'search': ('GET', lambda data, i: f"/search?q={data.champion(i)[:3]}", False),
+    'favorite': (None, lambda data, i: f"/favorite/{data.champion_ids[i % len(data.champion_ids)]}", True),
+    'favorites': ('GET', lambda data, i: "/favorites", True),
+    'comments': ('GET', lambda data, i: "/comments", True),
+    'profile_favorites': ('GET', lambda data, i: f"/profile/{data.username}/favorites", True),
+    'profile_comments': ('GET', lambda data, i: f"/profile/{data.username}/comments", True),
+}
+
+
+def champion_info(name, rng):
+    tags = rng.sample(TAGS, 2)
+    return {
+        "id": name,
+        "title": f"the {rng.choice(SYLLABLES).title()} {rng.choice(SYLLABLES)}",
+        "tags": tags,
+        "lore": " ".join(rng.choice(SYLLABLES) for _ in range(120)),
+        "info": {"difficulty": rng.randint(1, 10)},
+        "spells": [{"name": f"{name} {key}", "description": "Deals damage. " * 20,
+                    "image": {"group": "spell", "full": f"{name}{key}.png"}} for key in "QWER"],
+        "passive": {"name": f"{name} passive", "description": "Passive. " * 10,
+                    "image": {"group": "passive", "full": f"{name}_P.png"}},
+        "allytips": ["Ally tip"] * 3,
+        "enemytips": ["Enemy tip"] * 3,
+        "skins": [{"id": str(num), "num": num, "name": "default" if num == 0 else f"{name} skin {num}"}
+                  for num in range(rng.randint(3, 20))],
+    }
+
+
+class Dataset:
+    """Synthetic champions, users, favorites and comments"""
+
+    def __init__(self, champions, users, favorites, comments, seed=0):
+        self.rng = random.Random(seed)
+        self.sizes = {'champions': champions, 'users': users, 'favorites': favorites, 'comments': comments}
+
+    def champion(self, i):
+        return self.champion_names[i % len(self.champion_names)]
+
+    def seed(self):
+        rng = self.rng
+        names = set()
+        while len(names) < self.sizes['champions']:
+            names.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title())
+        self.champion_names = sorted(names)
+
+        db.drop_all()
+        db.create_all()
+
+        rows, tags = [], {}
+        for name in self.champion_names:
+            fields = build_champion_fields(champion_info(name, rng))
+            fields_hash = content_hash(fields)
+            tags[name] = fields.pop('tags')
+            rows.append(dict(name=name, content_hash=fields_hash, **fields))
+        inserted = db.session.execute(insert(Champion).returning(Champion.id, Champion.name), rows)
+        ChampionTag.replace({row.id: tags[row.name] for row in inserted})
+        Tag.refresh()
+
+        password = hash_password(PASSWORD)
+        db.session.execute(insert(User), [
+            dict(username=f"user{i}", email=f"user{i}@example.com", password=password)
+            for i in range(self.sizes['users'])])
+        db.session.flush()
+
+        self.champion_ids = list(db.session.scalars(db.select(Champion.id).order_by(Champion.id)))
+        user_ids = list(db.session.scalars(db.select(User.id).order_by(User.id)))
+        # The benchmark user gets a share of the favorites and comments
+        self.username = "user0"
+
+        pairs = set()
+        while len(pairs) < min(self.sizes['favorites'], len(user_ids) * len(self.champion_ids)):
+            user_id = user_ids[0] if rng.random() < 0.05 else rng.choice(user_ids)
+            pairs.add((user_id, rng.choice(self.champion_ids)))
+        if pairs:
+            db.session.execute(insert(Favorite), [
+                dict(user_id=user_id, champion_id=champion_id) for user_id, champion_id in sorted(pairs)])
+
+        if self.sizes['comments']:
+            db.session.execute(insert(Comment), [
+                dict(user_id=user_ids[0] if rng.random() < 0.05 else rng.choice(user_ids),
+                     champion_id=rng.choice(self.champion_ids), content=f"Comment {i}")
+                for i in range(self.sizes['comments'])])
+
+        SeedVersion.record(DDRAGON_VERSION)
+        db.session.commit()
+
+
+class TestClientDriver:
+    name = 'client'
+
+    def __init__(self):
+        self.client = app.test_client()
+
+    def login(self, username):
+        self.client.post("/login", data={"username": username, "password": PASSWORD})
+
+    def logout(self):
+        self.client.get("/logout")
+
+    def request(self, method, url):
+        response = self.client.open(url, method=method)
+        response.close()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class ServerDriver:
+    """Drives a threaded werkzeug server on a random local port over keep-alive"""
+    name = 'server'
+
+    def __init__(self):
+        self.server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietRequestHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.session = requests.Session()
+
+    def login(self, username):
+        self.session.post(f"{self.base_url}/login", data={"username": username, "password": PASSWORD})
+
+    def logout(self):
+        self.session.get(f"{self.base_url}/logout")
+
+    def request(self, method, url):
+        return self.session.request(method, self.base_url + url).status_code
+
+    def close(self):
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def bench_route(driver, data, route, requests_per_route, warmup):
+    method, url_for_request, needs_login = ROUTES[route]
+    if needs_login:
+        driver.login(data.username)
+
+    def issue(i):
+        # Favorites alternate PUT/DELETE so the row count stays stable
+        request_method = method or ("PUT" if (i // len(data.champion_ids)) % 2 == 0 else "DELETE")
+        status = driver.request(request_method, url_for_request(data, i))
+        if status >= 400:
+            raise RuntimeError(f"{route}: {request_method} {url_for_request(data, i)} returned {status}")
+
+    for i in range(warmup):
+        issue(i)
+
+    request_metrics.reset()
+    latencies = []
+    start = time.perf_counter()
+    for i in range(warmup, warmup + requests_per_route):
+        request_start = time.perf_counter()
+        issue(i)
+        latencies.append(time.perf_counter() - request_start)
+    elapsed = time.perf_counter() - start
+
+    statements = sum(request_metrics.statements.values())
+    if needs_login:
+        driver.logout()
+
+    latencies.sort()
+    return {
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'rps': round(requests_per_route / elapsed, 1),
+        'queries': round(statements / requests_per_route, 2),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of regressions of `results` against `baseline`"""
+    regressions = []
+    for key, before in sorted(baseline['routes'].items()):
+        after = results['routes'].get(key)
+        if after is None:
+            continue
+        if after['queries'] > before['queries']:
+            regressions.append(f"{key}: {before['queries']} -> {after['queries']} queries per request")
+        if after['p50_ms'] > before['p50_ms'] * (1 + tolerance):
+            regressions.append(f"{key}: p50 {before['p50_ms']}ms -> {after['p50_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--champions', type=int, default=170)
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--favorites', type=int, default=2000)
+    parser.add_argument('--comments', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per route')
+    parser.add_argument('--warmup', type=int, default=20, help='untimed requests per route')
+    parser.add_argument('--routes', nargs='+', choices=sorted(ROUTES), default=list(ROUTES))
+    parser.add_argument('--drivers', nargs='+', choices=['client', 'server'], default=['client', 'server'])
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p50 slowdown (0.25 = 25%%)')
+    args = parser.parse_args()
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['BCRYPT_LOG_ROUNDS'] = 4
+    with app.app_context():
+        database = db.engine.url.database or ''
+        in_memory = db.engine.url.get_backend_name() == 'sqlite' and database in ('', ':memory:')
+        if not in_memory and 'test' not in database and 'bench' not in database:
+            sys.exit(f"Refusing to drop the tables of database {database!r}; point DATABASE_URI at a test database.")
+
+        data = Dataset(args.champions, args.users, args.favorites, args.comments)
+        data.seed()
+
+    results = {'dataset': data.sizes, 'requests': args.requests, 'routes': {}}
+    print(f"{'route':<26} {'p50 ms':>8} {'p99 ms':>8} {'req/s':>8} {'queries':>8}")
+    for driver_class in [TestClientDriver, ServerDriver]:
+        if driver_class.name not in args.drivers:
+            continue
+        driver = driver_class()
+        try:
+            for route in args.routes:
+                stats = bench_route(driver, data, route, args.requests, args.warmup)
+                key = f"{driver.name}:{route}"
+                results['routes'][key] = stats
+                print(f"{key:<26} {stats['p50_ms']:>8} {stats['p99_ms']:>8} {stats['rps']:>8} {stats['queries']:>8}")
+        finally:
+            driver.close()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+import gzip
+import json
+import os
+import re
+import tempfile
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only .gz variants are written
+    brotli = None
+
+BUNDLE_NAME = re.compile(r"champions-[\w.-]+\.json")
+
+# Precompressed variants, preferred first when the client accepts several
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def bundle_name(version, revision):
+    """File name of a seed revision's bundle; a reseed on the same patch gets a new name"""
+    return f"champions-{version}-{revision}.json"
+
+
+def build_bundle(version, revision, champions):
+    """Serialize champion cards (slim fields only) to compact JSON bytes"""
+    payload = {'version': version, 'revision': revision,
+               'champions': [champion._asdict() for champion in champions]}
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def compress(payload, encoding):
+    if encoding == 'br':
+        return brotli.compress(payload, quality=11)
+    # mtime=0 keeps the .gz byte-identical across reseeds of the same data
+    return gzip.compress(payload, compresslevel=9, mtime=0)
+
+
+def write_file(path, data):
+    """Write via a temp file and rename, so readers never see a partial bundle"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_bundle(directory, version, revision, champions):
+    """Write champions-<version>-<revision>.json plus its .br/.gz variants; return the file name"""
+    os.makedirs(directory, exist_ok=True)
+    name = bundle_name(version, revision)
+    payload = build_bundle(version, revision, champions)
+
+    write_file(os.path.join(directory, name), payload)
+    for encoding, suffix in ENCODINGS:
+        if encoding == 'br' and brotli is None:
+            continue
+        write_file(os.path.join(directory, name + suffix), compress(payload, encoding))
+    return name
+
+
+def find_variant(directory, name, accept_encodings):
+    """Return (path, encoding) of the smallest variant the client accepts.
+
+    `encoding` is None for the uncompressed file; returns (None, None) if the
+    bundle does not exist.
+    """
+    path = os.path.join(directory, name)
+    for encoding, suffix in ENCODINGS:
+        if accept_encodings[encoding] and os.path.exists(path + suffix):
+            return path + suffix, encoding
+    if os.path.exists(path):
+        return path, None
+    return None, None
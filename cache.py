@@ -0,0 +1,203 @@
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # redis is optional; without it only the in-process cache is available
+    redis = None
+
+CACHE_ERRORS = (redis.RedisError,) if redis is not None else ()
+
+# How long a rebuild may hold an entry's lock, and how often waiters poll for its result
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.02
+
+# Delete a lock only if it still holds our token, in one step
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class BaseCache:
+    """Cache API shared by the backends: get/set/delete plus get_or_set.
+
+    Backends implement `_get`, `set`, `add` (set only if absent, used for
+    locks), `release`, `delete` and `clear`.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def get_or_set(self, key, create, timeout=None, lock_timeout=LOCK_TIMEOUT):
+        """Return the cached value for `key`, or store and return `create()`.
+
+        Only one caller at a time rebuilds a missing entry; the others wait for
+        its result instead of all rebuilding it at once. A waiter that gives
+        up on a stuck lock rebuilds and stores the entry itself. A `create()`
+        that returns None is not cached.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + lock_timeout
+        while not self.add(lock_key, token, lock_timeout):
+            time.sleep(LOCK_POLL_INTERVAL)
+            value = self._get(key)
+            if value is not None:
+                return value
+            if time.monotonic() >= deadline:
+                # The rebuilding worker is stuck or gone, build it ourselves
+                return self._create(key, create, timeout)
+
+        try:
+            return self._create(key, create, timeout)
+        finally:
+            self.release(lock_key, token)
+
+    def _create(self, key, create, timeout):
+        value = create()
+        if value is not None:
+            self.set(key, value, timeout)
+        return value
+
+
+class LRUCache(BaseCache):
+    """Thread-safe in-process LRU cache with a size cap and hit/miss counters"""
+
+    def __init__(self, maxsize=256):
+        super().__init__()
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            value, expires = self._data[key]
+            if expires is not None and expires <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        expires = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def add(self, key, value, timeout):
+        now = time.monotonic()
+        with self._lock:
+            current = self._locks.get(key)
+            if current is not None and current[1] > now:
+                return False
+            self._locks[key] = (value, now + timeout)
+            return True
+
+    def release(self, key, value):
+        with self._lock:
+            if self._locks.get(key, (None,))[0] == value:
+                del self._locks[key]
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisCache(BaseCache):
+    """Cache shared by every worker, stored in Redis (or anything speaking its API).
+
+    Values are pickled and keys are namespaced with `prefix`. If Redis is
+    unavailable, reads miss and writes are skipped, so an outage only costs
+    extra renders.
+    """
+
+    def __init__(self, client, prefix=''):
+        super().__init__()
+        self.client = client
+        self.prefix = prefix
+        self.release_script = client.register_script(RELEASE_SCRIPT)
+
+    @staticmethod
+    def milliseconds(timeout):
+        return int(timeout * 1000) if timeout else None
+
+    def _get(self, key):
+        try:
+            data = self.client.get(self.prefix + key)
+        except CACHE_ERRORS:
+            return None
+        return None if data is None else pickle.loads(data)
+
+    def set(self, key, value, timeout=None):
+        try:
+            self.client.set(self.prefix + key, pickle.dumps(value), px=self.milliseconds(timeout))
+        except CACHE_ERRORS:
+            pass
+
+    def add(self, key, value, timeout):
+        try:
+            return bool(self.client.set(self.prefix + key, value, nx=True, px=self.milliseconds(timeout)))
+        except CACHE_ERRORS:
+            # Without Redis there is nothing to coordinate, just rebuild
+            return True
+
+    def release(self, key, value):
+        try:
+            self.release_script(keys=[self.prefix + key], args=[value])
+        except CACHE_ERRORS:
+            pass
+
+    def delete(self, key):
+        try:
+            self.client.delete(self.prefix + key)
+        except CACHE_ERRORS:
+            pass
+
+    def clear(self):
+        try:
+            for key in self.client.scan_iter(match=self.prefix + '*'):
+                self.client.delete(key)
+        except CACHE_ERRORS:
+            pass
+
+
+def make_cache(url=None, prefix='', maxsize=256):
+    """An in-process LRUCache, or a RedisCache shared by all workers for a redis:// URL"""
+    if not url or url.startswith('memory://'):
+        return LRUCache(maxsize=maxsize)
+    if not url.startswith(('redis://', 'rediss://', 'unix://')):
+        raise ValueError(f"Unsupported cache URL {url!r}")
+    if redis is None:
+        raise RuntimeError("A redis:// CACHE_URL needs the redis package (pip install redis)")
+    return RedisCache(redis.Redis.from_url(url), prefix=prefix)
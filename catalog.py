@@ -0,0 +1,80 @@
+import threading
+from collections import namedtuple
+from database import db
+from models import Champion, ChampionTag, SeedVersion
+from search import SearchIndex
+
+ChampionCard = namedtuple('ChampionCard', ['id', 'name', 'title', 'image_url', 'tags'])
+
+
+class Catalog:
+    """Immutable snapshot of champion cards plus id, tag and search indexes"""
+    __slots__ = ('revision', 'champions', 'by_id', 'by_tag', 'search_index')
+
+    def __init__(self, revision, champions):
+        by_tag = {}
+        for champion in champions:
+            for tag in champion.tags or ():
+                by_tag.setdefault(tag, []).append(champion)
+
+        self.revision = revision
+        self.champions = tuple(champions)
+        self.by_id = {champion.id: champion for champion in self.champions}
+        self.by_tag = {tag: tuple(tagged) for tag, tagged in by_tag.items()}
+        self.search_index = SearchIndex(self.champions)
+
+    @classmethod
+    def load(cls, revision):
+        """Build a catalog from the slim champion columns and the tag table"""
+        tags = {}
+        for champion_id, tag in db.session.execute(
+                db.select(ChampionTag.champion_id, ChampionTag.tag)
+                .order_by(ChampionTag.champion_id, ChampionTag.position)):
+            tags.setdefault(champion_id, []).append(tag)
+
+        rows = db.session.execute(
+            db.select(Champion.id, Champion.name, Champion.title, Champion.image_url).order_by(Champion.id))
+        return cls(revision, [ChampionCard(*row, tags.get(row.id, [])) for row in rows])
+
+
+class CatalogCache:
+    """Per-process champion catalog, rebuilt whenever a seed changes champion data.
+
+    The cache is keyed by the latest seed revision, so a `flask seeddb` run in
+    another process is picked up on the next request. Databases that were never
+    seeded (e.g. in tests) have no revision and are always read fresh.
+    """
+
+    def __init__(self):
+        self._catalog = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, revision=None):
+        """Return the catalog for the latest (or the given) seed revision"""
+        if revision is None:
+            revision = SeedVersion.latest_id()
+        catalog = self._catalog
+        if revision is not None and catalog is not None and catalog.revision == revision:
+            self.hits += 1
+            return catalog
+
+        with self._lock:
+            # Another thread may have rebuilt the catalog while we waited
+            catalog = self._catalog
+            if revision is not None and catalog is not None and catalog.revision == revision:
+                self.hits += 1
+                return catalog
+
+            self.misses += 1
+            catalog = Catalog.load(revision)
+            if revision is not None:
+                self._catalog = catalog
+            return catalog
+
+    def invalidate(self):
+        self._catalog = None
+
+
+champion_catalog = CatalogCache()
@@ -1,5 +1,16 @@
+import sqlite3
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import Bcrypt
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from replicas import RoutingSession
 
-db = SQLAlchemy()
-bcrypt = Bcrypt()
\ No newline at end of file
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+@event.listens_for(Engine, "connect")
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores foreign keys unless asked; the favorite routes rely on them"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
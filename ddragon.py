@@ -0,0 +1,161 @@
+import json
+import os
+import tarfile
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_CONCURRENCY = 8
+REQUEST_TIMEOUT = 10
+
+CHAMPION_LIST_PATH = 'data/en_US/champion.json'
+CHAMPION_DETAIL_DIR = 'data/en_US/champion/'
+PROFILE_ICONS_PATH = 'data/en_US/profileicon.json'
+
+
+def make_session(pool_size=DEFAULT_CONCURRENCY, retries=3, backoff_factor=0.5):
+    """Create a session with a shared keep-alive pool and retry/backoff on GETs"""
+    retry = Retry(total=retries, backoff_factor=backoff_factor,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(['GET']))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch_json(session, url):
+    response = session.get(url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def order_like(champion_list, details):
+    """Return champion details in the same order as the champion list"""
+    return {name: details[name] for name in champion_list if name in details}
+
+
+#########################################################################
+# Data sources: each provides champion_data(), profile_icons() and, once
+# champion data has been loaded, the Data Dragon `version` it came from.
+
+class HttpSource:
+    """Data Dragon CDN, fetched with a bounded worker pool"""
+
+    def __init__(self, base_url, concurrency=DEFAULT_CONCURRENCY, session=None, version=None):
+        self.base_url = base_url
+        self.concurrency = max(1, concurrency)
+        self.session = session or make_session(pool_size=self.concurrency)
+        self.version = version
+
+    def champion_data(self):
+        # Fetch the list of all champions
+        champion_list = fetch_json(self.session, f'{self.base_url}/{CHAMPION_LIST_PATH}')
+        self.version = champion_list.get('version', self.version)
+
+        def fetch_one(champion_name):
+            data = fetch_json(self.session, f'{self.base_url}/{CHAMPION_DETAIL_DIR}{champion_name}.json')
+            return champion_name, data['data'][champion_name]
+
+        # Fetch detailed data for each champion, reusing pooled connections
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return dict(executor.map(fetch_one, champion_list['data']))
+
+    def profile_icons(self):
+        return fetch_json(self.session, f'{self.base_url}/{PROFILE_ICONS_PATH}')['data']
+
+
+class DirectorySource:
+    """Extracted dragontail-<version> directory"""
+
+    def __init__(self, path):
+        self.root = self.find_root(path)
+        self.version = None
+
+    @staticmethod
+    def find_root(path):
+        """Find the directory holding data/en_US (e.g. dragontail-13.14.1/13.14.1)"""
+        for dirpath, dirnames, _ in os.walk(path):
+            if os.path.isfile(os.path.join(dirpath, CHAMPION_LIST_PATH)):
+                return dirpath
+            dirnames[:] = [d for d in dirnames if d not in ('img', 'css', 'lolpatch')]
+        raise FileNotFoundError(f"No {CHAMPION_LIST_PATH} found under {path}")
+
+    def read_json(self, relative_path):
+        with open(os.path.join(self.root, relative_path), encoding='utf-8') as f:
+            return json.load(f)
+
+    def champion_data(self):
+        champion_list = self.read_json(CHAMPION_LIST_PATH)
+        self.version = champion_list.get('version')
+        return {name: self.read_json(f'{CHAMPION_DETAIL_DIR}{name}.json')['data'][name]
+                for name in champion_list['data']}
+
+    def profile_icons(self):
+        return self.read_json(PROFILE_ICONS_PATH)['data']
+
+
+class TarballSource:
+    """dragontail-<version>.tgz archive, streamed without extracting to disk"""
+
+    def __init__(self, path):
+        self.path = path
+        self.version = None
+
+    def iter_json(self, wanted):
+        """Yield (relative path, parsed JSON) for members accepted by `wanted`.
+
+        The archive is read as a single forward stream, so the (large) image
+        members are skipped without being decompressed into memory.
+        """
+        with tarfile.open(self.path, 'r|*') as archive:
+            for member in archive:
+                if not member.isfile() or not member.name.endswith('.json'):
+                    continue
+                _, sep, rest = member.name.partition('data/en_US/')
+                relative_path = sep + rest
+                if not sep or not wanted(relative_path):
+                    continue
+                yield relative_path, json.load(archive.extractfile(member))
+
+    def champion_data(self):
+        champion_list, details = None, {}
+
+        def wanted(path):
+            return path == CHAMPION_LIST_PATH or (
+                path.startswith(CHAMPION_DETAIL_DIR) and '/' not in path[len(CHAMPION_DETAIL_DIR):])
+
+        for path, data in self.iter_json(wanted):
+            if path == CHAMPION_LIST_PATH:
+                champion_list = data
+            else:
+                details.update(data['data'])
+
+        if champion_list is None:
+            raise FileNotFoundError(f"No {CHAMPION_LIST_PATH} found in {self.path}")
+        self.version = champion_list.get('version')
+        return order_like(champion_list['data'], details)
+
+    def profile_icons(self):
+        for _, data in self.iter_json(lambda path: path == PROFILE_ICONS_PATH):
+            return data['data']
+        raise FileNotFoundError(f"No {PROFILE_ICONS_PATH} found in {self.path}")
+
+
+def open_source(path):
+    """Return the offline data source for a dragontail directory or archive"""
+    if os.path.isdir(path):
+        return DirectorySource(path)
+    return TarballSource(path)
+
+
+def fetch_champion_data(base_url, concurrency=DEFAULT_CONCURRENCY, session=None):
+    """Fetch the detailed JSON for every champion using a bounded worker pool.
+
+    Returns a dict of champion name -> detail data, in the same order as the
+    champion list returned by Data Dragon.
+    """
+    return HttpSource(base_url, concurrency=concurrency, session=session).champion_data()
@@ -1,9 +1,7 @@
+import re
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField, SelectField, TextAreaField
-from wtforms.validators import DataRequired, Email, EqualTo, ValidationError, Length
-from models import User
-from database import bcrypt, db
-from flask import flash
+from wtforms.validators import DataRequired, Email, EqualTo, Length
 
 class SignupForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=2, max=20)])
@@ -12,25 +10,23 @@ class SignupForm(FlaskForm):
     confirm_password = PasswordField('Confirm Password', validators=[DataRequired(), EqualTo('password')])
     submit = SubmitField('Sign Up')
 
-    def validate_username(self, username):
-        user = User.query.filter_by(username=username.data).first()
-        if user:
-            raise ValidationError('That username is taken. Please choose a different one.')
+    UNIQUE_ERRORS = {
+        'username': 'That username is taken. Please choose a different one.',
+        'email': 'That email is taken. Please choose a different one.',
+    }
 
-    def validate_email(self, email):
-        user = User.query.filter_by(email=email.data).first()
-        if user:
-            raise ValidationError('That email is taken. Please choose a different one.')
-    
-    def save_user(self):
-        try:
-            hashed_password = bcrypt.generate_password_hash(self.password.data).decode('utf-8')
-            user = User(username=self.username.data, email=self.email.data, password=hashed_password)
-            db.session.add(user)
-            db.session.commit()
-        except Exception as e:
-            flash('An error occurred while creating the user. Please try again.', 'error')
-            print(f"Error: {e}")
+    def add_unique_error(self, error):
+        """Turn a unique violation from the users INSERT into a field error.
+
+        The constraint comes first in the database message ("users_email_key"
+        on PostgreSQL, "users.email" on SQLite). Return False if it is not on
+        username or email.
+        """
+        match = re.search(r"\busers[._](username|email)", str(error.orig))
+        if match is None:
+            return False
+        self[match.group(1)].errors.append(self.UNIQUE_ERRORS[match.group(1)])
+        return True
 
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired()])
@@ -0,0 +1,89 @@
+import io
+import os
+import re
+import threading
+from PIL import Image
+from bundle import write_file
+from ddragon import make_session, REQUEST_TIMEOUT
+
+# Stored Data Dragon URLs use both http:// and https://
+DDRAGON_CDN_URL = re.compile(r"^https?://ddragon\.leagueoflegends\.com/cdn/(.+)$")
+IMAGE_PATH = re.compile(r"(?:[\w-][\w.-]*/)*[\w-][\w.-]*\.(?:jpg|png)")
+
+# Bounding boxes; images keep their aspect ratio and are never upscaled
+VARIANTS = {
+    'card': (640, 640),
+    'large': (960, 960),
+    'avatar': (160, 160),
+    'icon': (64, 64),
+}
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 82, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+}
+
+# Cold images hash onto a fixed set of locks, so memory doesn't grow with every path requested
+LOCK_STRIPES = 64
+
+_session = None
+_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+
+def cdn_path(url):
+    """'https://ddragon.leagueoflegends.com/cdn/img/x.jpg' -> 'img/x.jpg', None for other hosts"""
+    match = DDRAGON_CDN_URL.match(url or '')
+    if match and IMAGE_PATH.fullmatch(match.group(1)):
+        return match.group(1)
+    return None
+
+
+def lock_for(key):
+    return _locks[hash(key) % LOCK_STRIPES]
+
+
+def fetch(url):
+    """GET an image from the origin; raises requests.HTTPError on 4xx/5xx"""
+    global _session
+    if _session is None:
+        _session = make_session()
+    response = _session.get(url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.content
+
+
+def resize(data, size):
+    with Image.open(io.BytesIO(data)) as image:
+        image_format = image.format
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, image_format, **SAVE_OPTIONS.get(image_format, {}))
+    return buffer.getvalue()
+
+
+def cached_image(directory, origin, variant, path):
+    """Return the file path of a resized Data Dragon image, fetching it at most once.
+
+    The original is stored under `original/` and each variant is derived from
+    it on first request. A striped per-image lock keeps concurrent requests
+    for a cold image from fetching or resizing it twice.
+    """
+    variant_path = os.path.join(directory, variant, path)
+    if os.path.exists(variant_path):
+        return variant_path
+
+    with lock_for(path):
+        if os.path.exists(variant_path):
+            return variant_path
+
+        original_path = os.path.join(directory, 'original', path)
+        if os.path.exists(original_path):
+            with open(original_path, 'rb') as f:
+                data = f.read()
+        else:
+            data = fetch(f"{origin.rstrip('/')}/cdn/{path}")
+            os.makedirs(os.path.dirname(original_path), exist_ok=True)
+            write_file(original_path, data)
+
+        os.makedirs(os.path.dirname(variant_path), exist_ok=True)
+        write_file(variant_path, resize(data, VARIANTS[variant]))
+    return variant_path
@@ -0,0 +1,215 @@
+import hmac
+import threading
+import time
+from flask import Response, abort, before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Request latency buckets in seconds (upper bounds, +Inf is implied)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(labels):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestStats:
+    """SQL and template timings collected while handling one request"""
+    __slots__ = ('start', 'status', 'statements', 'db_time', 'render_time', 'render_starts')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        # Stays 500 unless a response is produced
+        self.status = 500
+        self.statements = []
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.render_starts = []
+
+
+class RequestMetrics:
+    """Per-endpoint request latency, SQL and template render metrics.
+
+    Every request records its latency in a histogram, and adds its SQL
+    statement count, database time and Jinja render time to per-endpoint
+    counters. `render()` returns everything in the Prometheus text format.
+    Requests slower than SLOW_REQUEST_THRESHOLD seconds are logged with their
+    SQL. Register with `init_app(app)`.
+
+    Metrics are kept per process: with several gunicorn workers each scrape
+    sees only the worker that answered it. `response()` is only served to
+    loopback clients, or to any client sending METRICS_TOKEN as a bearer token.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.latency = {}
+        self.requests = {}
+        self.statements = {}
+        self.db_time = {}
+        self.render_time = {}
+        self.counters = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_REQUEST_THRESHOLD', None)
+        app.config.setdefault('METRICS_TOKEN', None)
+        app.before_request(self.start_request)
+        app.after_request(self.set_status)
+        # Teardown also runs when a view raises, so unhandled errors are counted
+        app.teardown_request(self.finish_request)
+        before_render_template.connect(self.start_render, app)
+        template_rendered.connect(self.finish_render, app)
+        event.listen(Engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self.after_cursor_execute)
+        event.listen(Engine, 'handle_error', self.handle_error)
+        self.app = app
+
+    def reset(self):
+        with self._lock:
+            for values in (self.latency, self.requests, self.statements, self.db_time, self.render_time):
+                values.clear()
+
+    def counter(self, name, help_text, value):
+        """Also export `value()` as a counter, e.g. a cache's hit count"""
+        self.counters.append((name, help_text, value))
+
+    # Hooks
+
+    def current(self):
+        return g.get('request_stats') if has_request_context() else None
+
+    def start_request(self):
+        g.request_stats = RequestStats()
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        stats = self.current()
+        if stats is not None:
+            stats.statements.append((statement, elapsed))
+            stats.db_time += elapsed
+
+    def handle_error(self, context):
+        # A failed statement never reaches after_cursor_execute
+        if context.connection is not None and context.connection.info.get('query_start'):
+            context.connection.info['query_start'].pop()
+
+    def start_render(self, sender, template, context, **extra):
+        stats = self.current()
+        if stats is not None:
+            stats.render_starts.append(time.perf_counter())
+
+    def finish_render(self, sender, template, context, **extra):
+        stats = self.current()
+        if stats is not None and stats.render_starts:
+            elapsed = time.perf_counter() - stats.render_starts.pop()
+            # Only count the outermost template, nested renders are part of it
+            if not stats.render_starts:
+                stats.render_time += elapsed
+
+    def set_status(self, response):
+        stats = g.get('request_stats')
+        if stats is not None:
+            stats.status = response.status_code
+        return response
+
+    def finish_request(self, exc=None):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return
+        duration = time.perf_counter() - stats.start
+        endpoint = request.endpoint or 'unmatched'
+        status = 500 if exc is not None else stats.status
+        self.record(endpoint, request.method, status, duration, stats)
+
+        threshold = self.app.config['SLOW_REQUEST_THRESHOLD']
+        if threshold is not None and duration >= threshold:
+            queries = '\n'.join(f'  {elapsed * 1000:.1f}ms {statement}' for statement, elapsed in stats.statements)
+            self.app.logger.warning(
+                'Slow request: %s %s took %.1fms (%d queries, %.1fms in the database)\n%s',
+                request.method, request.full_path, duration * 1000, len(stats.statements),
+                stats.db_time * 1000, queries)
+
+    def record(self, endpoint, method, status, duration, stats):
+        key = (endpoint, method)
+        with self._lock:
+            self.latency.setdefault(key, Histogram()).observe(duration)
+            self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+            self.statements[key] = self.statements.get(key, 0) + len(stats.statements)
+            self.db_time[key] = self.db_time.get(key, 0.0) + stats.db_time
+            self.render_time[key] = self.render_time.get(key, 0.0) + stats.render_time
+
+    # Prometheus text format
+
+    def render(self):
+        lines = []
+
+        def header(name, help_text, metric_type):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+
+        def labels(key):
+            return format_labels({'endpoint': key[0], 'method': key[1]})
+
+        with self._lock:
+            header('http_requests_total', 'Requests handled, by endpoint, method and status.', 'counter')
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                status_labels = format_labels({'endpoint': endpoint, 'method': method, 'status': status})
+                lines.append(f'http_requests_total{status_labels} {count}')
+
+            header('http_request_duration_seconds', 'Request latency, by endpoint and method.', 'histogram')
+            for key, histogram in sorted(self.latency.items()):
+                for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                    bucket_labels = format_labels({'endpoint': key[0], 'method': key[1], 'le': bound})
+                    lines.append(f'http_request_duration_seconds_bucket{bucket_labels} {count}')
+                inf_labels = format_labels({'endpoint': key[0], 'method': key[1], 'le': '+Inf'})
+                lines.append(f'http_request_duration_seconds_bucket{inf_labels} {histogram.count}')
+                lines.append(f'http_request_duration_seconds_sum{labels(key)} {histogram.sum}')
+                lines.append(f'http_request_duration_seconds_count{labels(key)} {histogram.count}')
+
+            for name, help_text, values in [
+                    ('db_statements_total', 'SQL statements executed while handling requests.', self.statements),
+                    ('db_duration_seconds_total', 'Time spent executing SQL while handling requests.', self.db_time),
+                    ('template_render_seconds_total', 'Time spent rendering Jinja templates.', self.render_time)]:
+                header(name, help_text, 'counter')
+                for key, value in sorted(values.items()):
+                    lines.append(f'{name}{labels(key)} {value}')
+
+        for name, help_text, value in self.counters:
+            header(name, help_text, 'counter')
+            lines.append(f'{name} {value()}')
+        return '\n'.join(lines) + '\n'
+
+    def allowed(self):
+        token = self.app.config['METRICS_TOKEN']
+        if token:
+            return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+        return request.remote_addr in ('127.0.0.1', '::1')
+
+    def response(self):
+        if not self.allowed():
+            abort(403)
+        return Response(self.render(), content_type=CONTENT_TYPE)
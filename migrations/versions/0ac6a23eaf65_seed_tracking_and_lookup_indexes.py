@@ -0,0 +1,53 @@
+"""seed tracking and lookup indexes
+
+Adds the seed revision table and champion content hashes used by incremental
+`flask seeddb`, plus indexes/constraints for the hot lookups: unique champion
+names, one favorite per user and champion, comment listings per champion and
+per user, and a GIN index for `Champion.tags.any(...)`.
+
+Revision ID: 0ac6a23eaf65
+Revises: 17c13c3dd46d
+Create Date: 2026-10-18 12:53:50.076389
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0ac6a23eaf65'
+down_revision = '17c13c3dd46d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('seed_versions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.String(), nullable=False),
+    sa.Column('seeded_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.add_column('champions', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_unique_constraint('champions_name_key', 'champions', ['name'])
+    op.create_index('ix_champions_tags', 'champions', ['tags'], unique=False, postgresql_using='gin')
+
+    # Concurrent clicks could create duplicate favorites; keep the oldest of each
+    op.execute("""
+        DELETE FROM favorites a USING favorites b
+        WHERE a.user_id = b.user_id AND a.champion_id = b.champion_id AND a.id > b.id
+    """)
+    op.create_unique_constraint('uq_favorites_user_id_champion_id', 'favorites', ['user_id', 'champion_id'])
+
+    op.create_index('ix_comments_champion_id_date', 'comments', ['champion_id', 'date'], unique=False)
+    op.create_index('ix_comments_user_id_date', 'comments', ['user_id', 'date'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_comments_user_id_date', table_name='comments')
+    op.drop_index('ix_comments_champion_id_date', table_name='comments')
+    op.drop_constraint('uq_favorites_user_id_champion_id', 'favorites', type_='unique')
+    op.drop_index('ix_champions_tags', table_name='champions', postgresql_using='gin')
+    op.drop_constraint('champions_name_key', 'champions', type_='unique')
+    op.drop_column('champions', 'content_hash')
+    op.drop_table('seed_versions')
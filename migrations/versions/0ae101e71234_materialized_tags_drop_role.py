@@ -0,0 +1,51 @@
+"""materialized tags, drop champion role
+
+Adds the `tags` table holding each tag's champion ids and count, filled from
+`champion_tags` here and rebuilt by every `flask seeddb`. Drops
+`champions.role`, which duplicated the first tag and is now derived from it.
+
+Revision ID: 0ae101e71234
+Revises: af6ab3b4c3b6
+Create Date: 2026-10-18 13:41:05.733190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0ae101e71234'
+down_revision = 'af6ab3b4c3b6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tags = op.create_table('tags',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('champion_count', sa.Integer(), nullable=False),
+    sa.Column('champion_ids', sa.JSON(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+    # Grouped in Python rather than with json_agg, so this runs on any database
+    champion_ids = {}
+    for tag, champion_id in op.get_bind().execute(sa.text(
+            "SELECT tag, champion_id FROM champion_tags ORDER BY tag, champion_id")):
+        champion_ids.setdefault(tag, []).append(champion_id)
+    op.bulk_insert(tags, [dict(name=tag, champion_count=len(ids), champion_ids=ids)
+                          for tag, ids in champion_ids.items()])
+
+    with op.batch_alter_table('champions') as batch_op:
+        batch_op.drop_column('role')
+
+
+def downgrade():
+    with op.batch_alter_table('champions') as batch_op:
+        batch_op.add_column(sa.Column('role', sa.VARCHAR(), autoincrement=False, nullable=True))
+    op.execute("""
+        UPDATE champions SET role = (SELECT tag FROM champion_tags
+                                     WHERE champion_tags.champion_id = champions.id
+                                     ORDER BY position LIMIT 1)
+    """)
+    op.drop_table('tags')
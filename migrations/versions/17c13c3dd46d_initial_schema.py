@@ -0,0 +1,77 @@
+"""initial schema
+
+Tables as originally created by `db.create_all()`. Databases that were set up
+that way can be marked as being at this revision with `flask db stamp 17c13c3dd46d`
+before running `flask db upgrade`.
+
+Revision ID: 17c13c3dd46d
+Revises: 
+Create Date: 2026-10-18 12:53:47.988609
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '17c13c3dd46d'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('password', sa.String(), nullable=False),
+    sa.Column('image_url', sa.String(), nullable=True),
+    sa.Column('bio', sa.Text(), nullable=True),
+    sa.Column('summoner_name', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('champions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('role', sa.String(), nullable=True),
+    sa.Column('tags', postgresql.ARRAY(sa.String()), nullable=True),
+    sa.Column('image_url', sa.String(), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('difficulty', sa.Integer(), nullable=True),
+    sa.Column('abilities', sa.JSON(), nullable=True),
+    sa.Column('passive', sa.JSON(), nullable=True),
+    sa.Column('allytips', sa.JSON(), nullable=True),
+    sa.Column('enemytips', sa.JSON(), nullable=True),
+    sa.Column('skins', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('favorites',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('champion_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['champion_id'], ['champions.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('comments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('content', sa.String(), nullable=False),
+    sa.Column('date', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('champion_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['champion_id'], ['champions.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('comments')
+    op.drop_table('favorites')
+    op.drop_table('champions')
+    op.drop_table('users')
@@ -0,0 +1,60 @@
+"""champion tags table
+
+Moves `champions.tags` (a PostgreSQL ARRAY) into a `champion_tags` table so
+the models also work on SQLite. Existing tags are copied over in order.
+
+Like the revisions before it, this one only runs on PostgreSQL: the column it
+converts is an ARRAY. SQLite databases (tests, benchmarks) get their schema
+from `db.create_all()` instead of `flask db upgrade`.
+
+Revision ID: af6ab3b4c3b6
+Revises: 0ac6a23eaf65
+Create Date: 2026-10-18 13:20:12.418207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'af6ab3b4c3b6'
+down_revision = '0ac6a23eaf65'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('champion_tags',
+    sa.Column('champion_id', sa.Integer(), nullable=False),
+    sa.Column('tag', sa.String(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['champion_id'], ['champions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('champion_id', 'tag')
+    )
+    op.create_index('ix_champion_tags_tag_champion_id', 'champion_tags', ['tag', 'champion_id'], unique=False)
+
+    # Keep the first occurrence of a repeated tag, as the PRIMARY KEY requires
+    op.execute("""
+        INSERT INTO champion_tags (champion_id, tag, position)
+        SELECT id, tag, MIN(position) - 1
+        FROM champions, unnest(tags) WITH ORDINALITY AS t(tag, position)
+        GROUP BY id, tag
+    """)
+
+    op.drop_index('ix_champions_tags', table_name='champions', postgresql_using='gin')
+    op.drop_column('champions', 'tags')
+
+
+def downgrade():
+    op.add_column('champions', sa.Column('tags', postgresql.ARRAY(sa.VARCHAR()), autoincrement=False, nullable=True))
+    op.execute("""
+        UPDATE champions SET tags = t.tags
+        FROM (SELECT champion_id, array_agg(tag ORDER BY position) AS tags
+              FROM champion_tags GROUP BY champion_id) AS t
+        WHERE champions.id = t.champion_id
+    """)
+    op.create_index('ix_champions_tags', 'champions', ['tags'], unique=False, postgresql_using='gin')
+
+    op.drop_index('ix_champion_tags_tag_champion_id', table_name='champion_tags')
+    op.drop_table('champion_tags')
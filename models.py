@@ -1,5 +1,8 @@
-from database import db, bcrypt
+from database import db
 from datetime import datetime
+from passwords import hash_password, check_password, needs_rehash
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -18,7 +21,7 @@ class User(db.Model):
     def signup(cls, username, password, email):
         user = User(
             username=username,
-            password=bcrypt.generate_password_hash(password).decode('utf-8'),
+            password=hash_password(password),
             email=email,
         )
 
@@ -29,48 +32,211 @@ class User(db.Model):
     def authenticate(cls, username, password):
         """Validate that user exists & password is correct.
 
-        Return user if valid; else return False.
+        Return user if valid; else return False. If the stored hash was made
+        with a different work factor than BCRYPT_LOG_ROUNDS it is replaced;
+        the caller commits the change.
         """
 
         user = User.query.filter_by(username=username).first()
 
-        if user and bcrypt.check_password_hash(user.password, password):
+        if user and check_password(user.password, password):
+            if needs_rehash(user.password):
+                user.password = hash_password(password)
             # return user instance
             return user
         else:
             return False
 
+def dialect_name():
+    return db.session.get_bind().dialect.name
+
+def insert_or_ignore(model):
+    """INSERT that supports ON CONFLICT on both PostgreSQL and SQLite"""
+    return (sqlite_insert if dialect_name() == 'sqlite' else pg_insert)(model)
+
 class Champion(db.Model):
     __tablename__ = 'champions'
 
+    # Listing pages only need the card columns; everything rendered on the
+    # champion detail page is deferred into the 'details' group.
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String, nullable=False)
-    role = db.Column(db.String)
-    tags = db.Column(db.ARRAY(db.String))
+    name = db.Column(db.String, nullable=False, unique=True)
     image_url = db.Column(db.String)
-    description = db.Column(db.Text) 
     title = db.Column(db.String) 
-    difficulty = db.Column(db.Integer)  
-    abilities = db.Column(db.JSON)     
-    passive = db.Column(db.JSON)   
-    allytips = db.Column(db.JSON)      
-    enemytips = db.Column(db.JSON) 
-    skins = db.Column(db.JSON)
+    description = db.deferred(db.Column(db.Text), group='details')
+    difficulty = db.deferred(db.Column(db.Integer), group='details')
+    abilities = db.deferred(db.Column(db.JSON), group='details')
+    passive = db.deferred(db.Column(db.JSON), group='details')
+    allytips = db.deferred(db.Column(db.JSON), group='details')
+    enemytips = db.deferred(db.Column(db.JSON), group='details')
+    skins = db.deferred(db.Column(db.JSON), group='details')
+    content_hash = db.deferred(db.Column(db.String(64)))
     favorites = db.relationship('Favorite', backref='champion', lazy=True)
     comments = db.relationship('Comment', backref='champion', lazy=True)
+    tag_rows = db.relationship('ChampionTag', order_by='ChampionTag.position',
+                               cascade='all, delete-orphan', lazy=True)
+
+    @property
+    def tags(self):
+        """Tags in Data Dragon order; assign a new list to change them"""
+        return [row.tag for row in self.tag_rows]
+
+    @tags.setter
+    def tags(self, tags):
+        self.tag_rows = [ChampionTag(tag=tag, position=position)
+                         for position, tag in enumerate(dict.fromkeys(tags or ()))]
+
+    @property
+    def role(self):
+        """The primary tag, e.g. "Fighter" for ["Fighter", "Tank"]"""
+        tags = self.tags
+        return tags[0] if tags else None
+
+    @role.setter
+    def role(self, role):
+        self.tags = [role] + [tag for tag in self.tags if tag != role]
+
+class ChampionTag(db.Model):
+    """One of a champion's tags ("Mage", "Assassin", ...)"""
+    __tablename__ = 'champion_tags'
+    __table_args__ = (
+        # Backs Tag.refresh(), which reads champions grouped by tag
+        db.Index('ix_champion_tags_tag_champion_id', 'tag', 'champion_id'),
+    )
+
+    champion_id = db.Column(db.Integer, db.ForeignKey('champions.id', ondelete='CASCADE'), primary_key=True)
+    tag = db.Column(db.String, primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+
+    @classmethod
+    def replace(cls, tags_by_champion_id):
+        """Set the tags of many champions with one DELETE and one bulk INSERT"""
+        db.session.execute(db.delete(cls).where(cls.champion_id.in_(list(tags_by_champion_id))))
+        rows = [dict(champion_id=champion_id, tag=tag, position=position)
+                for champion_id, tags in tags_by_champion_id.items()
+                for position, tag in enumerate(dict.fromkeys(tags or ()))]
+        if rows:
+            db.session.execute(db.insert(cls), rows)
+
+class Tag(db.Model):
+    """A tag with its champion ids, materialized from champion_tags at seed time"""
+    __tablename__ = 'tags'
+
+    name = db.Column(db.String, primary_key=True)
+    champion_count = db.Column(db.Integer, nullable=False, default=0)
+    champion_ids = db.Column(db.JSON, nullable=False, default=list)
+
+    @classmethod
+    def refresh(cls):
+        """Rebuild every tag's champion id list (in id order) from champion_tags"""
+        champion_ids = {}
+        for tag, champion_id in db.session.execute(
+                db.select(ChampionTag.tag, ChampionTag.champion_id)
+                .order_by(ChampionTag.tag, ChampionTag.champion_id)):
+            champion_ids.setdefault(tag, []).append(champion_id)
+
+        db.session.execute(db.delete(cls))
+        if champion_ids:
+            db.session.execute(db.insert(cls), [
+                dict(name=tag, champion_count=len(ids), champion_ids=ids) for tag, ids in champion_ids.items()])
 
 class Favorite(db.Model):
     __tablename__ = 'favorites'
+    __table_args__ = (
+        # One favorite per user/champion; also serves lookups by user_id
+        db.UniqueConstraint('user_id', 'champion_id', name='uq_favorites_user_id_champion_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     champion_id = db.Column(db.Integer, db.ForeignKey('champions.id'), nullable=False)
 
+    @classmethod
+    def add(cls, user_id, champion_id):
+        """Favorite a champion; a no-op if it is already favorited"""
+        db.session.execute(insert_or_ignore(cls).values(user_id=user_id, champion_id=champion_id)
+                           .on_conflict_do_nothing(index_elements=['user_id', 'champion_id']))
+
+    @classmethod
+    def remove(cls, user_id, champion_id):
+        """Unfavorite a champion; a no-op if it is not favorited"""
+        db.session.execute(db.delete(cls).filter_by(user_id=user_id, champion_id=champion_id))
+
+    @classmethod
+    def toggle(cls, user_id, champion_id):
+        """Add or remove a favorite in a single atomic statement.
+
+        Deletes the favorite if it exists, otherwise inserts it. Returns True if
+        the champion is now favorited. SQLite has no data-modifying CTEs, but
+        it serializes writers, so there the DELETE and INSERT run separately.
+        On PostgreSQL an insert that conflicts with a concurrent one returns no
+        row either, so that case is told apart from a delete with a lookup.
+        """
+        if dialect_name() == 'sqlite':
+            deleted = db.session.execute(db.delete(cls).filter_by(user_id=user_id, champion_id=champion_id)
+                                         .returning(cls.id)).first()
+            if deleted is not None:
+                return False
+            cls.add(user_id, champion_id)
+            return True
+
+        deleted = (db.delete(cls).filter_by(user_id=user_id, champion_id=champion_id)
+                   .returning(cls.id).cte('deleted'))
+        inserted = (pg_insert(cls)
+                    .from_select(['user_id', 'champion_id'],
+                                 db.select(db.literal(user_id), db.literal(champion_id))
+                                 .where(~db.exists(db.select(deleted.c.id))))
+                    .on_conflict_do_nothing(index_elements=['user_id', 'champion_id'])
+                    .returning(cls.id))
+        if db.session.execute(inserted).first() is not None:
+            return True
+        return db.session.execute(db.select(db.exists().where(
+            cls.user_id == user_id, cls.champion_id == champion_id))).scalar()
+
 class Comment(db.Model):
     __tablename__ = 'comments'
+    __table_args__ = (
+        # Back the newest-first comment listings per champion and per user
+        db.Index('ix_comments_champion_id_date', 'champion_id', 'date'),
+        db.Index('ix_comments_user_id_date', 'user_id', 'date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.String, nullable=False)
     date = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     champion_id = db.Column(db.Integer, db.ForeignKey('champions.id'), nullable=False)
+
+class SeedVersion(db.Model):
+    """Data Dragon patch versions ingested by `flask seeddb`.
+
+    A row is added for every seed that changes champion data, so the latest id
+    doubles as a revision number for caches built from the champions table.
+    """
+    __tablename__ = 'seed_versions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.String, nullable=False)
+    seeded_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @classmethod
+    def current(cls):
+        """Return the most recently seeded patch version, or None"""
+        latest = cls.latest()
+        return latest.version if latest else None
+
+    @classmethod
+    def latest(cls):
+        """Return the latest seed revision row, or None if never seeded"""
+        return cls.query.order_by(cls.id.desc()).first()
+
+    @classmethod
+    def latest_id(cls):
+        """Return the id of the latest seed revision, or None if never seeded"""
+        return db.session.execute(db.select(db.func.max(cls.id))).scalar()
+
+    @classmethod
+    def record(cls, version, changed=True):
+        """Record a seed revision if champion data or the patch version changed"""
+        if changed or cls.current() != version:
+            db.session.add(cls(version=version))
@@ -0,0 +1,64 @@
+import os
+import threading
+import bcrypt
+from contextlib import contextmanager
+from flask import current_app, has_app_context
+
+DEFAULT_LOG_ROUNDS = 12
+DEFAULT_HASH_WORKERS = os.cpu_count() or 1
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def config(key, default):
+    if has_app_context():
+        return current_app.config.get(key, default)
+    return default
+
+
+@contextmanager
+def hash_slot():
+    """Limit how many bcrypt calls run at once (PASSWORD_HASH_WORKERS, default one per CPU).
+
+    bcrypt releases the GIL, so without a cap a login burst on a threaded
+    worker runs a hash on every thread and they all slow down together. The
+    hash still runs on, and blocks, the calling request thread.
+    """
+    global _slots
+    if _slots is None:
+        with _slots_lock:
+            if _slots is None:
+                _slots = threading.BoundedSemaphore(config('PASSWORD_HASH_WORKERS', DEFAULT_HASH_WORKERS))
+    with _slots:
+        yield
+
+
+def log_rounds():
+    """The configured bcrypt work factor (BCRYPT_LOG_ROUNDS)"""
+    return config('BCRYPT_LOG_ROUNDS', DEFAULT_LOG_ROUNDS)
+
+
+def hash_password(password, rounds=None):
+    salt = bcrypt.gensalt(rounds or log_rounds())
+    with hash_slot():
+        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
+    return hashed.decode('utf-8')
+
+
+def check_password(hashed, password):
+    try:
+        with hash_slot():
+            return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+
+def hash_rounds(hashed):
+    """Work factor a hash was created with, e.g. 12 for '$2b$12$...'"""
+    return int(hashed.split('$')[2])
+
+
+def needs_rehash(hashed, rounds=None):
+    return hash_rounds(hashed) != (rounds or log_rounds())
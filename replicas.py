@@ -0,0 +1,80 @@
+import os
+import time
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+
+REPLICA_BIND = 'replica'
+PRIMARY_UNTIL_KEY = 'primary_until'
+READ_METHODS = ('GET', 'HEAD')
+
+
+def engine_options(uri, environ=os.environ):
+    """Connection pool settings for `uri` from DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    DB_POOL_RECYCLE (seconds) and DB_POOL_PRE_PING"""
+    if make_url(uri).get_backend_name() == 'sqlite':
+        # Flask-SQLAlchemy picks SQLite's pool, which takes no sizing options
+        return {}
+    return {
+        'pool_size': int(environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_recycle': int(environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': environ.get('DB_POOL_PRE_PING', '1').lower() not in ('0', 'false', 'no'),
+    }
+
+
+def read_only(view):
+    """Mark a view as safe to serve from the read replica"""
+    view.read_only = True
+    return view
+
+
+class RoutingSession(Session):
+    """Sends SELECTs issued by read-only requests to the "replica" bind.
+
+    Everything else goes to the primary. Flushes and INSERT/UPDATE/DELETE
+    statements mark the request as a write, so the acting user reads from
+    the primary for a while after.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or getattr(clause, 'is_dml', False):
+                g.wrote_primary = True
+            elif g.get('use_replica') and (clause is None or getattr(clause, 'is_select', False)):
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Decides per request whether reads may go to the replica.
+
+    Only GET/HEAD requests to views marked `@read_only` use it, and only when
+    SQLALCHEMY_BINDS has a "replica" engine. A request that writes keeps that
+    user's session on the primary for REPLICA_READ_YOUR_WRITES seconds, which
+    should cover the replication lag. Register with `init_app(app, db)`
+    before any other before_request hook that queries.
+    """
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        app.config.setdefault('REPLICA_READ_YOUR_WRITES', 10)
+        app.before_request(self.choose_bind)
+        app.after_request(self.remember_write)
+        self.db = db
+
+    def enabled(self):
+        return REPLICA_BIND in self.db.engines
+
+    def choose_bind(self):
+        view = current_app.view_functions.get(request.endpoint)
+        g.use_replica = (request.method in READ_METHODS and getattr(view, 'read_only', False)
+                         and self.enabled() and session.get(PRIMARY_UNTIL_KEY, 0) <= time.time())
+
+    def remember_write(self, response):
+        if g.get('wrote_primary') and self.enabled():
+            session[PRIMARY_UNTIL_KEY] = time.time() + current_app.config['REPLICA_READ_YOUR_WRITES']
+        return response
@@ -0,0 +1,143 @@
+import re
+import unicodedata
+from cache import LRUCache
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+FUZZY_THRESHOLD = 0.3
+RESULT_CACHE_SIZE = 1024
+
+# Ranking tiers, best first
+NAME_PREFIX, NAME_WORD_PREFIX, NAME_SUBSTRING, TITLE_MATCH, FUZZY = range(5)
+
+
+def normalize(text):
+    """Lowercase, strip accents and drop punctuation/spaces ("Kai'Sa" -> "kaisa")"""
+    text = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in text.lower() if ch.isalnum())
+
+
+def words(text):
+    return [normalize(word) for word in re.split(r"[\s'.&-]+", text or '') if normalize(word)]
+
+
+def typo_distance(a, b, limit=None):
+    """Optimal string alignment distance (edits, including adjacent swaps).
+
+    With a `limit`, gives up and returns limit + 1 as soon as the distance is
+    known to exceed it.
+    """
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def allowed_typos(query):
+    if len(query) >= 8:
+        return 2
+    if len(query) >= 4:
+        return 1
+    return 0
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchEntry:
+    __slots__ = ('champion', 'name', 'name_words', 'title', 'title_words', 'trigrams')
+
+    def __init__(self, champion):
+        self.champion = champion
+        self.name = normalize(champion.name)
+        self.name_words = words(champion.name)
+        self.title = normalize(champion.title)
+        self.title_words = words(champion.title)
+        self.trigrams = trigrams(self.name)
+
+
+class SearchIndex:
+    """In-memory ranked champion search over names and titles.
+
+    Results are ordered by tier (name prefix, name word prefix, name substring,
+    title match, then typo-tolerant matches on the name) and then by similarity
+    and name. A name is a typo match if it shares enough trigrams with the query
+    or if its prefix is within one or two edits of it ("ahir" -> "Ahri").
+    """
+
+    def __init__(self, champions):
+        self.entries = [SearchEntry(champion) for champion in champions]
+        self.by_trigram = {}
+        for entry in self.entries:
+            for trigram in entry.trigrams:
+                self.by_trigram.setdefault(trigram, []).append(entry)
+        # Autocomplete sends the same prefixes over and over
+        self.results = LRUCache(maxsize=RESULT_CACHE_SIZE)
+
+    def rank(self, entry, query):
+        if entry.name.startswith(query):
+            return NAME_PREFIX
+        if any(word.startswith(query) for word in entry.name_words):
+            return NAME_WORD_PREFIX
+        if query in entry.name:
+            return NAME_SUBSTRING
+        if query in entry.title or any(word.startswith(query) for word in entry.title_words):
+            return TITLE_MATCH
+        return None
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Return up to `limit` champions matching `query`, best match first"""
+        query = normalize(query)
+        if not query:
+            return []
+        limit = max(1, min(limit, MAX_LIMIT))
+
+        results = self.results.get(query)
+        if results is None:
+            results = self.ranked(query)
+            self.results.set(query, results)
+        return results[:limit]
+
+    def ranked(self, query):
+        """Return all champions matching a normalized query, best match first"""
+        # Count shared trigrams to score candidates for similarity
+        query_trigrams = trigrams(query)
+        shared = {}
+        for trigram in query_trigrams:
+            for entry in self.by_trigram.get(trigram, ()):
+                shared[entry] = shared.get(entry, 0) + 1
+
+        def similarity(entry):
+            common = shared.get(entry, 0)
+            return common / (len(query_trigrams) + len(entry.trigrams) - common)
+
+        # Prefix, substring and title matches are cheap string checks over everyone
+        results, matched = [], set()
+        for entry in self.entries:
+            tier = self.rank(entry, query)
+            if tier is not None:
+                results.append((tier, -similarity(entry), entry.name, entry.champion))
+                matched.add(entry)
+
+        # Typo matches only among the names sharing at least two trigrams
+        typos = allowed_typos(query)
+        for entry, common in shared.items():
+            if common < 2 or entry in matched:
+                continue
+            score = similarity(entry)
+            if score >= FUZZY_THRESHOLD or (
+                    typos and typo_distance(query, entry.name[:len(query)], typos) <= typos):
+                results.append((FUZZY, -score, entry.name, entry.champion))
+
+        results.sort(key=lambda result: result[:3])
+        return tuple(result[3] for result in results[:MAX_LIMIT])
@@ -1,22 +1,157 @@
 // Homepage Carousel
+function initCarousel($carousel) {
+  $carousel.carousel();
+
+  $carousel.on("slid.bs.carousel", function () {
+    var idx = $carousel.find(".carousel-item.active").index(); // Get index of current active item within THIS carousel
+
+    $carousel
+      .find(".carousel-indicators li") // Select only indicators within THIS carousel
+      .removeClass("active")
+      .eq(idx)
+      .addClass("active");
+  });
+}
+
 $(window).on("load", function () {
-  // initialize all carousels
+  // initialize all server-rendered carousels
   $(".carousel").each(function () {
-    const $carousel = $(this);
+    initCarousel($(this));
+  });
+});
+
+// Champion bundle: once seeded, the homepage carousels and search are
+// rendered here from one immutable, cached JSON download
+const championContainer = document.getElementById("championCarousels");
+const championBundle = championContainer
+  ? fetch(championContainer.dataset.bundleUrl).then(function (response) {
+      if (!response.ok) {
+        throw new Error(`Champion bundle returned ${response.status}`);
+      }
+      return response.json();
+    })
+  : null;
+
+// Same rules as search.normalize: lowercase, no accents or punctuation
+function normalizeName(text) {
+  return (text || "").normalize("NFKD").toLowerCase().replace(/[^\p{L}\p{N}]/gu, "");
+}
 
-    $carousel.carousel();
+function nameWords(text) {
+  return (text || "").split(/[\s'.&-]+/).map(normalizeName).filter(Boolean);
+}
 
-    $carousel.on("slid.bs.carousel", function () {
-      var idx = $carousel.find(".carousel-item.active").index(); // Get index of current active item within THIS carousel
+// Prefix, word prefix, substring and title matches, like the server's
+// ranking minus its typo tolerance
+function searchBundle(champions, term, limit) {
+  const query = normalizeName(term);
+  const tiers = [[], [], [], []];
+  if (!query) {
+    return [];
+  }
+  champions.forEach(function (champion) {
+    const name = normalizeName(champion.name);
+    let tier = -1;
+    if (name.startsWith(query)) {
+      tier = 0;
+    } else if (nameWords(champion.name).some((word) => word.startsWith(query))) {
+      tier = 1;
+    } else if (name.includes(query)) {
+      tier = 2;
+    } else if (
+      normalizeName(champion.title).includes(query) ||
+      nameWords(champion.title).some((word) => word.startsWith(query))
+    ) {
+      tier = 3;
+    }
+    if (tier >= 0) {
+      tiers[tier].push(champion.name);
+    }
+  });
+  return [].concat(...tiers.map((names) => names.sort())).slice(0, limit);
+}
+
+// Same mapping as the `resized` template filter
+const DDRAGON_CDN_URL = /^https?:\/\/ddragon\.leagueoflegends\.com\/cdn\/(.+)$/;
+const IMAGE_PATH = /^(?:[\w-][\w.-]*\/)*[\w-][\w.-]*\.(?:jpg|png)$/;
+
+function cardImageUrl(url, prefix) {
+  const match = DDRAGON_CDN_URL.exec(url || "");
+  return match && IMAGE_PATH.test(match[1]) ? prefix + match[1] : url;
+}
+
+function championCard(champion, imagePrefix) {
+  const $link = $("<a>").attr("href", "/champion/" + encodeURIComponent(champion.name)).text(champion.name);
+  return $("<div>")
+    .addClass("card")
+    .append(
+      $("<img>")
+        .addClass("card-img-top img-fluid")
+        .attr({ src: cardImageUrl(champion.image_url, imagePrefix), loading: "lazy", alt: champion.name }),
+      $("<div>")
+        .addClass("card-body")
+        .append($("<h5>").addClass("card-title").append($link), $("<p>").addClass("card-text").text(champion.title))
+    );
+}
+
+function carouselControl(id, direction, label) {
+  return $("<button>")
+    .addClass(`carousel-control-${direction}`)
+    .attr({ type: "button", "data-bs-target": "#" + id, "data-bs-slide": direction })
+    .append(
+      $("<span>").addClass(`carousel-control-${direction}-icon`).attr("aria-hidden", "true"),
+      $("<span>").addClass("visually-hidden").text(label)
+    );
+}
 
-      $carousel
-        .find(".carousel-indicators li") // Select only indicators within THIS carousel
-        .removeClass("active")
-        .eq(idx)
-        .addClass("active");
+// Three cards per slide, matching the server-rendered markup
+function renderCarousel(id, champions, imagePrefix) {
+  const $indicators = $("<ol>").addClass("carousel-indicators");
+  const $inner = $("<div>").addClass("carousel-inner row w-100 mx-auto");
+  for (let i = 0; i < champions.length; i += 3) {
+    const slide = i / 3;
+    $indicators.append(
+      $("<li>").attr({ "data-target": "#" + id, "data-slide-to": slide }).toggleClass("active", slide === 0)
+    );
+    const $item = $("<div>").addClass("carousel-item col-md-4").toggleClass("active", slide === 0);
+    champions.slice(i, i + 3).forEach(function (champion) {
+      $item.append(championCard(champion, imagePrefix));
     });
+    $inner.append($item);
+  }
+  return $("<div>")
+    .attr({ id: id, "data-bs-ride": "carousel" })
+    .addClass("carousel slide")
+    .append($indicators, $inner, carouselControl(id, "prev", "Previous"), carouselControl(id, "next", "Next"));
+}
+
+if (championBundle) {
+  $(function () {
+    const $container = $(championContainer);
+    const imagePrefix = $container.data("card-image-prefix");
+    const headers = $container.data("headers");
+
+    championBundle.then(
+      function (bundle) {
+        $container.data("tags").forEach(function (tag) {
+          const champions =
+            tag === "all" ? bundle.champions : bundle.champions.filter((champion) => champion.tags.includes(tag));
+          if (!champions.length) {
+            return;
+          }
+          const id = tag === "all" ? "allChampionCarousel" : tag + "Carousel";
+          const $carousel = renderCarousel(id, champions, imagePrefix);
+          $container.append($("<h2>").addClass("champion-header").text(headers[tag]), $carousel);
+          initCarousel($carousel);
+        });
+      },
+      function (error) {
+        console.error("Could not load champions: ", error);
+        $container.append($("<p>").addClass("text-center").text("Champions could not be loaded. Please refresh the page."));
+      }
+    );
   });
-});
+}
 
 // Champion Skin Carousel
 $(document).ready(function () {
@@ -27,16 +162,32 @@ $(document).ready(function () {
 $(function () {
   $("#search-input").autocomplete({
     source: function (request, response) {
-      $.ajax({
-        url: "/search",
-        dataType: "json",
-        data: {
-          q: request.term,
-        },
-        success: function (data) {
-          response(data);
-        },
-      });
+      function searchServer() {
+        $.ajax({
+          url: "/search",
+          dataType: "json",
+          data: {
+            q: request.term,
+          },
+          success: function (data) {
+            response(data);
+          },
+        });
+      }
+
+      if (!championBundle) {
+        searchServer();
+        return;
+      }
+      // Answer from the bundle; only misspellings need the server's typo matching
+      championBundle.then(function (bundle) {
+        const names = searchBundle(bundle.champions, request.term, 10);
+        if (names.length) {
+          response(names);
+        } else {
+          searchServer();
+        }
+      }, searchServer);
     },
     minLength: 2,
     select: function (event, ui) {
@@ -48,9 +199,11 @@ $(function () {
 // Favorite Toggling
 $(document).on("click", "#favorite-btn", function () {
   const championId = $(this).data("champion-id");
+  // PUT/DELETE set the state explicitly, so a retried request can't flip it back
+  const isFavorited = $(this).hasClass("btn-warning");
   $.ajax({
     url: `/favorite/${championId}`,
-    type: "POST",
+    type: isFavorited ? "DELETE" : "PUT",
     success: function (response) {
       if (response.is_authenticated === false) {
         alert("Please log in to favorite!");
@@ -75,3 +228,31 @@ $(document).on("click", "#favorite-btn", function () {
     },
   });
 });
+
+// Champion Comment Thread
+$(document).on("click", "#more-comments-btn", function () {
+  const btn = $(this);
+  $.ajax({
+    url: btn.data("url"),
+    dataType: "json",
+    data: {
+      before: btn.data("cursor"),
+    },
+    success: function (response) {
+      response.comments.forEach(function (comment) {
+        const link = $("<a>").attr("href", comment.profile_url).text(comment.username);
+        const small = $("<small>").append("Posted by ", link, " on " + comment.date);
+        const p = $("<p>").text(comment.content + " - ").append(small);
+        $("#comment-list").append($("<div>").addClass("comment").append(p));
+      });
+      if (response.next_cursor) {
+        btn.data("cursor", response.next_cursor);
+      } else {
+        btn.remove();
+      }
+    },
+    error: function (xhr, status, error) {
+      console.error("An error occurred: ", error);
+    },
+  });
+});
@@ -0,0 +1,77 @@
+#  terminal:
+#  python -m unittest test_assets.py
+
+import gzip
+import os
+import tempfile
+from unittest import TestCase
+from app import app, asset_url
+from assets import AssetBuilder, load_manifest
+
+STATIC_DIR = app.static_folder
+
+
+class AssetBuildTestCase(TestCase):
+    """Test fingerprinting and serving static assets"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        app.config['ASSETS_DIR'] = self.tmp.name
+        self.builder = AssetBuilder(STATIC_DIR, self.tmp.name, '/assets')
+        self.manifest = self.builder.build()
+
+    def tearDown(self):
+        app.config['ASSETS_DIR'] = os.path.join(STATIC_DIR, 'dist')
+        self.tmp.cleanup()
+
+    def read(self, name):
+        with open(os.path.join(self.tmp.name, name), 'rb') as f:
+            return f.read()
+
+    def test_fingerprinted_manifest(self):
+        """Are entry points and referenced fonts fingerprinted and precompressed?"""
+        self.assertRegex(self.manifest['app.js'], r"^app\.[0-9a-f]{12}\.js$")
+        self.assertEqual(load_manifest(self.tmp.name), self.manifest)
+
+        hashed = self.manifest['style.css']
+        self.assertEqual(gzip.decompress(self.read(hashed + '.gz')), self.read(hashed))
+
+        # Only the fonts style.css actually uses are shipped
+        fonts = sorted(name for name in self.manifest if name.startswith('fonts/'))
+        self.assertEqual(len(fonts), 4)
+        self.assertNotIn('fonts/Spiegel_TT_Bold.ttf', self.manifest)
+
+    def test_css_points_at_fingerprinted_fonts(self):
+        """Does the built CSS reference the fingerprinted font files?"""
+        css = self.read(self.manifest['style.css']).decode()
+        font = self.manifest['fonts/Spiegel_TT_Regular.ttf']
+
+        self.assertNotIn('/static/fonts/', css)
+        self.assertIn(f'url("/assets/{font}")', css)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, font)))
+
+    def test_asset_url(self):
+        """Does the template helper prefer fingerprinted URLs?"""
+        with app.test_request_context():
+            self.assertEqual(asset_url('app.js'), f"/assets/{self.manifest['app.js']}")
+            self.assertEqual(asset_url('missing.js'), "/static/missing.js")
+
+    def test_serve_asset(self):
+        """Are assets served precompressed with far-future caching?"""
+        client = app.test_client()
+        url = f"/assets/{self.manifest['style.css']}"
+
+        resp = client.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content_encoding, "gzip")
+        self.assertEqual(resp.mimetype, "text/css")
+        self.assertTrue(resp.cache_control.immutable)
+        self.assertEqual(resp.cache_control.max_age, 365 * 24 * 60 * 60)
+
+        resp = client.get(url)
+        self.assertIsNone(resp.content_encoding)
+        self.assertIn(b"@font-face", resp.data)
+
+        self.assertEqual(client.get("/assets/../app.py").status_code, 404)
+        self.assertEqual(client.get("/assets/style.000000000000.css").status_code, 404)
+        self.assertEqual(client.get("/assets/manifest.json").status_code, 404)
@@ -0,0 +1,164 @@
+#  terminal:
+#  python -m unittest test_cache.py
+
+import threading
+import time
+from fnmatch import fnmatchcase
+from unittest import TestCase
+from unittest.mock import patch
+from cache import LRUCache, RedisCache, make_cache
+
+
+class FakeRedis:
+    """The few Redis commands RedisCache uses, kept in a dict"""
+
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value, expires = self.data.get(key, (None, None))
+            if expires is not None and expires <= time.monotonic():
+                del self.data[key]
+                return None
+            return value
+
+    def set(self, key, value, px=None, nx=False):
+        if isinstance(value, str):
+            value = value.encode()
+        with self.lock:
+            current = self.data.get(key)
+            if nx and current is not None and (current[1] is None or current[1] > time.monotonic()):
+                return None
+            self.data[key] = (value, time.monotonic() + px / 1000 if px else None)
+            return True
+
+    def delete(self, key):
+        with self.lock:
+            return int(self.data.pop(key, None) is not None)
+
+    def scan_iter(self, match):
+        return [key for key in list(self.data) if fnmatchcase(key, match)]
+
+    def register_script(self, script):
+        # The only script RedisCache runs: delete a key if it holds a given value
+        def release(keys, args):
+            with self.lock:
+                if self.data.get(keys[0], (None,))[0] == args[0].encode():
+                    del self.data[keys[0]]
+                    return 1
+                return 0
+        return release
+
+
+class CacheTestCase(TestCase):
+    """Test the in-process and Redis cache backends"""
+
+    def backends(self):
+        return [LRUCache(maxsize=2), RedisCache(FakeRedis(), prefix="test:")]
+
+    def test_get_set_delete(self):
+        """Do both backends store, expire and delete values?"""
+        for cache in self.backends():
+            with self.subTest(cache=type(cache).__name__):
+                cache.set("a", {"html": "<p>a</p>"})
+                cache.set("b", [1, 2], timeout=0.01)
+                self.assertEqual(cache.get("a"), {"html": "<p>a</p>"})
+                time.sleep(0.02)
+                self.assertIsNone(cache.get("b"))
+
+                cache.delete("a")
+                self.assertEqual(cache.get("a", "missing"), "missing")
+                self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_lru_eviction(self):
+        """Does the in-process cache drop the least recently used entry?"""
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+
+    def test_redis_prefix_and_clear(self):
+        """Are Redis keys namespaced, and does clear() only remove our own?"""
+        client = FakeRedis()
+        client.set("other", b"keep")
+        cache = RedisCache(client, prefix="pages:")
+        cache.set("/", "home")
+        self.assertIn("pages:/", client.data)
+
+        cache.clear()
+        self.assertIsNone(cache.get("/"))
+        self.assertEqual(client.get("other"), b"keep")
+
+    def test_redis_unavailable(self):
+        """Does an unreachable Redis turn reads into misses and writes and clear() into no-ops?"""
+        class DownRedis:
+            def __getattr__(self, name):
+                def command(*args, **kwargs):
+                    raise ConnectionError("redis is down")
+                return command
+
+            def register_script(self, script):
+                # Registering is local; running the script needs the server
+                return self.evalsha
+
+        cache = RedisCache(DownRedis(), prefix="pages:")
+        with patch("cache.CACHE_ERRORS", (ConnectionError,)):
+            cache.set("/", "home")
+            self.assertIsNone(cache.get("/"))
+            cache.clear()
+            self.assertEqual(cache.get_or_set("/", lambda: "home"), "home")
+
+    def test_get_or_set_stampede(self):
+        """Is a missing hot entry built once while concurrent callers wait for it?"""
+        for cache in self.backends():
+            with self.subTest(cache=type(cache).__name__):
+                calls = []
+
+                def create():
+                    calls.append(1)
+                    time.sleep(0.1)
+                    return "page"
+
+                results = []
+                threads = [threading.Thread(target=lambda: results.append(cache.get_or_set("home", create)))
+                           for _ in range(8)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+                self.assertEqual(len(calls), 1)
+                self.assertEqual(results, ["page"] * 8)
+                self.assertEqual(cache.get_or_set("home", create), "page")
+                self.assertEqual(len(calls), 1)
+
+    def test_get_or_set_uncached(self):
+        """Are None results not stored, and is a stale lock eventually ignored?"""
+        cache = LRUCache()
+        self.assertIsNone(cache.get_or_set("missing", lambda: None))
+        self.assertEqual(cache.get_or_set("missing", lambda: "built"), "built")
+
+        cache.add("lock:stuck", "someone-else", 10)
+        self.assertEqual(cache.get_or_set("stuck", lambda: "built", lock_timeout=0.05), "built")
+        # The waiter stored what it built, so later callers don't rebuild it
+        self.assertEqual(cache.get_or_set("stuck", lambda: "rebuilt", lock_timeout=0.05), "built")
+
+    def test_redis_release_own_lock(self):
+        """Is a lock only released by the holder of its token?"""
+        cache = RedisCache(FakeRedis(), prefix="test:")
+        self.assertTrue(cache.add("lock:home", "mine", 10))
+        cache.release("lock:home", "someone-else")
+        self.assertFalse(cache.add("lock:home", "theirs", 10))
+        cache.release("lock:home", "mine")
+        self.assertTrue(cache.add("lock:home", "theirs", 10))
+
+    def test_make_cache(self):
+        """Is the in-process cache the default, and are unknown URLs rejected?"""
+        self.assertIsInstance(make_cache(None, maxsize=5), LRUCache)
+        self.assertEqual(make_cache("memory://").maxsize, 256)
+        with self.assertRaises(ValueError):
+            make_cache("memcached://localhost")
@@ -0,0 +1,74 @@
+#  terminal:
+#  export SQLALCHEMY_DATABASE_URI=postgresql:///lol-dex-test
+#  python -m unittest test_catalog.py
+
+import os
+from unittest import TestCase
+from flask import Flask
+from database import db
+from models import Champion, SeedVersion
+from catalog import CatalogCache
+
+
+class CatalogTestCase(TestCase):
+    """Test the in-process champion catalog"""
+
+    def setUp(self):
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("SQLALCHEMY_DATABASE_URI", "postgresql:///lol-dex-test")
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+        db.init_app(app)
+
+        self.app_context = app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+
+        db.session.add(Champion(name="Garen", title="The Might of Demacia", tags=["Fighter", "Tank"],
+                                image_url="http://example.com/garen.png", description="Garen lore"))
+        db.session.add(Champion(name="Ahri", title="The Nine-Tailed Fox", tags=["Mage", "Assassin"],
+                                image_url="http://example.com/ahri.png", description="Ahri lore"))
+        db.session.commit()
+
+        self.cache = CatalogCache()
+
+    def tearDown(self):
+        """Clean up fouled transactions."""
+        db.session.rollback()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_catalog_tag_index(self):
+        """Does the catalog hold slim cards indexed by tag?"""
+        catalog = self.cache.get()
+
+        self.assertEqual([c.name for c in catalog.champions], ["Garen", "Ahri"])
+        self.assertEqual([c.name for c in catalog.by_tag["Tank"]], ["Garen"])
+        self.assertEqual([c.name for c in catalog.by_tag["Mage"]], ["Ahri"])
+        self.assertFalse(hasattr(catalog.champions[0], "description"))
+
+    def test_unseeded_catalog_not_cached(self):
+        """Is the catalog read fresh when the database was never seeded?"""
+        self.cache.get()
+        self.cache.get()
+
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 2))
+
+    def test_catalog_cached_per_revision(self):
+        """Is the catalog reused until a new seed revision is recorded?"""
+        SeedVersion.record("13.14.1")
+        db.session.commit()
+
+        first = self.cache.get()
+        self.assertIs(self.cache.get(), first)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+        db.session.add(Champion(name="Zed", title="The Master of Shadows", tags=["Assassin"]))
+        SeedVersion.record("13.14.1")
+        db.session.commit()
+
+        catalog = self.cache.get()
+        self.assertEqual(self.cache.misses, 2)
+        self.assertEqual([c.name for c in catalog.by_tag["Assassin"]], ["Ahri", "Zed"])
@@ -3,12 +3,13 @@
 #  python -m unittest test_champion_model.py
 #  WSL: export SQLALCHEMY_DATABASE_URI=postgresql:///lol-dex-test; python -m unittest test_champion_model.py
 
+import os
 from unittest import TestCase
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm.collections import InstrumentedList
 from flask import Flask
-from database import db, bcrypt
-from models import Champion, User, Favorite, Comment
+from database import db
+from models import Champion, ChampionTag, User, Favorite, Comment
 
 
 class ChampionModelTestCase(TestCase):
@@ -17,12 +18,12 @@ class ChampionModelTestCase(TestCase):
     def setUp(self):
         """Create test client, add sample data."""
         app = Flask(__name__)
-        app.config['SQLALCHEMY_DATABASE_URI'] = "postgresql:///lol-dex-test"
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("SQLALCHEMY_DATABASE_URI", "postgresql:///lol-dex-test")
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
         app.config['SECRET_KEY'] = "TEST_SECRET_KEY"
+        app.config['BCRYPT_LOG_ROUNDS'] = 4
 
         db.init_app(app)
-        bcrypt.init_app(app)
 
         self.client = app.test_client()
 
@@ -31,13 +32,13 @@ class ChampionModelTestCase(TestCase):
 
         db.create_all()
 
-        champion1 = Champion(name="Test Champion 1", role="Role 1", tags=["Tag 1", "Tag 2"],
+        champion1 = Champion(name="Test Champion 1", tags=["Tag 1", "Tag 2"],
                              image_url="http://example.com/test_champ_1.png",
                              description="Test Champion 1 description",
                              title="Test Champion 1 title",
                              difficulty=3, abilities={}, passive={}, allytips={}, enemytips={}, skins={})
 
-        champion2 = Champion(name="Test Champion 2", role="Role 2", tags=["Tag 3", "Tag 4"],
+        champion2 = Champion(name="Test Champion 2", tags=["Tag 3", "Tag 4"],
                              image_url="http://example.com/test_champ_2.png",
                              description="Test Champion 2 description",
                              title="Test Champion 2 title",
@@ -84,13 +85,46 @@ class ChampionModelTestCase(TestCase):
         self.assertIsInstance(champion.favorites, InstrumentedList)
         self.assertIsInstance(champion.comments, InstrumentedList)
 
+    def test_champion_tags(self):
+        """Are tags stored in their own table, in order and without duplicates?"""
+        champion1_id, champion2_id = self.champion1.id, self.champion2.id
+        champion = db.session.get(Champion, champion1_id)
+        self.assertEqual(champion.tags, ["Tag 1", "Tag 2"])
+
+        champion.tags = ["Tag 2", "Tag 5", "Tag 2"]
+        db.session.commit()
+        db.session.expunge_all()
+        self.assertEqual(db.session.get(Champion, champion1_id).tags, ["Tag 2", "Tag 5"])
+
+        ChampionTag.replace({champion1_id: ["Tag 9"], champion2_id: []})
+        db.session.commit()
+        db.session.expunge_all()
+        self.assertEqual(db.session.get(Champion, champion1_id).tags, ["Tag 9"])
+        self.assertEqual(db.session.get(Champion, champion2_id).tags, [])
+
+    def test_champion_role(self):
+        """Is the role the first tag, and does setting it move that tag first?"""
+        champion = db.session.get(Champion, self.champion1.id)
+        self.assertEqual(champion.role, "Tag 1")
+
+        champion.role = "Tag 2"
+        self.assertEqual(champion.tags, ["Tag 2", "Tag 1"])
+        self.assertIsNone(Champion(name="Untagged").role)
+
     def test_champion_required_name(self):
         """Does Champion model enforce name being non-nullable?"""
         with self.assertRaises(IntegrityError):
-            bad_champion = Champion(role="Role 3")
+            bad_champion = Champion(title="Test Champion 3 title")
             db.session.add(bad_champion)
             db.session.commit()
     
+    def test_champion_unique_name(self):
+        """Does Champion model enforce unique names?"""
+        with self.assertRaises(IntegrityError):
+            duplicate = Champion(name="Test Champion 1")
+            db.session.add(duplicate)
+            db.session.commit()
+
     def test_champion_update(self):
         """Can we update a Champion instance?"""
         champion = Champion.query.get(self.champion1.id)
@@ -119,6 +153,18 @@ class ChampionModelTestCase(TestCase):
         self.assertEqual(len(self.champion1.favorites), 1)
         self.assertEqual(self.champion1.favorites[0].user_id, user.id)
 
+    def test_champion_favorite_unique(self):
+        """Can a user favorite the same champion only once?"""
+        user = User.signup("test_user", "password", "test_user@email.com")
+        db.session.commit()
+
+        db.session.add(Favorite(user_id=user.id, champion_id=self.champion1.id))
+        db.session.commit()
+
+        with self.assertRaises(IntegrityError):
+            db.session.add(Favorite(user_id=user.id, champion_id=self.champion1.id))
+            db.session.commit()
+
     def test_champion_comment_relationship(self):
         """Does the Comment relationship in the Champion model work?"""
         user = User.signup("test_user", "password", "test_user@email.com")
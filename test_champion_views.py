@@ -3,10 +3,15 @@
 #  python -m unittest test_champion_views.py
 #  WSL: export SQLALCHEMY_DATABASE_URI=postgresql:///lol-dex-test; python -m unittest test_champion_views.py
 
+import os
+import re
 from unittest import TestCase
+from sqlalchemy import event
 from database import db
-from models import Champion
-from app import app
+from models import Champion, User, Favorite, Comment, SeedVersion, Tag
+from app import app, champion_fragments, CURR_USER_KEY
+
+LIST_COLUMNS = {"id", "name", "title", "image_url", "tags"}
 
 
 class ChampionViewsTestCase(TestCase):
@@ -14,9 +19,10 @@ class ChampionViewsTestCase(TestCase):
 
     def setUp(self):
         """Create test client, add sample data."""
-        app.config['SQLALCHEMY_DATABASE_URI'] = "postgresql:///lol-dex-test"
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("SQLALCHEMY_DATABASE_URI", "postgresql:///lol-dex-test")
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
         app.config['SECRET_KEY'] = "TEST_SECRET_KEY"
+        app.config['BCRYPT_LOG_ROUNDS'] = 4
 
         self.client = app.test_client()
 
@@ -28,7 +34,6 @@ class ChampionViewsTestCase(TestCase):
         # Create sample champions
         champion1 = Champion(
             name="Test Champion 1", 
-            role="Tank", 
             tags=["Tank", "Fighter"],
             image_url="http://example.com/test_champ_1.png",
             description="Test Champion 1 description",
@@ -46,7 +51,6 @@ class ChampionViewsTestCase(TestCase):
 
         champion2 = Champion(
             name="Test Champion 2", 
-            role="Mage", 
             tags=["Mage", "Support"],
             image_url="http://example.com/test_champ_2.png",
             description="Test Champion 2 description",
@@ -63,6 +67,8 @@ class ChampionViewsTestCase(TestCase):
 
         db.session.add(champion1)
         db.session.add(champion2)
+        db.session.flush()
+        Tag.refresh()
         db.session.commit()
 
         self.champion1 = champion1
@@ -104,6 +110,16 @@ class ChampionViewsTestCase(TestCase):
             self.assertIn(self.champion1.name, resp.get_data(as_text=True))
             self.assertIn(self.champion2.name, resp.get_data(as_text=True))
 
+    def test_search_route_ranked(self):
+        """Does search rank the closest name first and honor the limit?"""
+        with self.client as c:
+            resp = c.get("/search?q=testchampion2&limit=1")
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.json, [self.champion2.name])
+
+            resp = c.get(f"/search?q={self.champion2.title}")
+            self.assertEqual(resp.json[0], self.champion2.name)
+
     def test_tag_route(self):
         """Test tag route"""
         with self.client as c:
@@ -112,4 +128,117 @@ class ChampionViewsTestCase(TestCase):
             self.assertIn(self.champion1.name, resp.get_data(as_text=True))
             self.assertNotIn(self.champion2.name, resp.get_data(as_text=True))
 
-    
+    def champion_columns(self, url):
+        """Return the champions.* columns referenced by the SQL a request emits"""
+        statements = []
+        db.session.expunge_all()
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            resp = self.client.get(url)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+        self.assertEqual(resp.status_code, 200)
+        return set(re.findall(r"champions(?:_\d+)?\.(\w+)", " ".join(statements)))
+
+    def test_list_routes_load_card_columns(self):
+        """Do listing routes skip the heavy champion detail columns?"""
+        user = User.signup("testuser", "password", "testuser@email.com")
+        db.session.commit()
+        user_id = user.id
+        db.session.add(Favorite(user_id=user_id, champion_id=self.champion1.id))
+        db.session.commit()
+
+        for url in ["/", "/tag/Tank", "/search?q=Test", "/profile/testuser/favorites"]:
+            with self.subTest(url=url):
+                columns = self.champion_columns(url)
+                self.assertTrue(columns)
+                self.assertLessEqual(columns, LIST_COLUMNS)
+
+        with self.client.session_transaction() as sess:
+            sess[CURR_USER_KEY] = user_id
+        self.assertLessEqual(self.champion_columns("/favorites"), LIST_COLUMNS)
+
+    def test_champion_page_loads_detail_columns(self):
+        """Does the champion page load the detail columns?"""
+        columns = self.champion_columns(f"/champion/{self.champion1.name}")
+
+        self.assertLessEqual({"description", "abilities", "passive", "allytips", "enemytips", "skins"}, columns)
+
+    def test_champion_page_fragment_cache(self):
+        """Are the static champion fragments rendered once per content hash?"""
+        self.champion1.content_hash = "a" * 64
+        db.session.commit()
+        champion_fragments.clear()
+
+        first = self.champion_columns(f"/champion/{self.champion1.name}")
+        second = self.champion_columns(f"/champion/{self.champion1.name}")
+
+        self.assertIn("abilities", first)
+        self.assertLessEqual(second, LIST_COLUMNS | {"content_hash"})
+        self.assertEqual(len(champion_fragments), 1)
+
+        resp = self.client.get("/champion/Test Champion 1")
+        self.assertIn("Test Champion 1 description", resp.get_data(as_text=True))
+        self.assertIn("Ability 4", resp.get_data(as_text=True))
+
+    def test_http_caching(self):
+        """Do anonymous visits revalidate with a 304 once the database is seeded?"""
+        with self.client as c:
+            resp = c.get("/")
+            self.assertIsNone(resp.get_etag()[0])
+            self.assertIn("no-cache", resp.headers["Cache-Control"])
+
+            SeedVersion.record("13.14.1")
+            self.champion1.content_hash = "a" * 64
+            db.session.commit()
+
+            for url in ["/", "/champion/Test Champion 1", "/tag/Tank", "/search?q=test"]:
+                with self.subTest(url=url):
+                    resp = c.get(url)
+                    etag = resp.get_etag()[0]
+                    self.assertEqual(resp.status_code, 200)
+                    self.assertTrue(etag)
+                    self.assertIn("public", resp.headers["Cache-Control"])
+                    self.assertIn("Cookie", resp.headers.get("Vary", ""))
+                    self.assertIsNotNone(resp.last_modified)
+
+                    resp = c.get(url, headers={"If-None-Match": f'"{etag}"'})
+                    self.assertEqual(resp.status_code, 304)
+
+    def test_http_caching_comment_changes_etag(self):
+        """Does a new comment invalidate the champion page validator?"""
+        SeedVersion.record("13.14.1")
+        self.champion1.content_hash = "a" * 64
+        user = User.signup("testuser", "password", "testuser@email.com")
+        db.session.commit()
+
+        with self.client as c:
+            etag = c.get("/champion/Test Champion 1").get_etag()[0]
+            db.session.add(Comment(content="New comment", user_id=user.id, champion_id=self.champion1.id))
+            db.session.commit()
+
+            resp = c.get("/champion/Test Champion 1", headers={"If-None-Match": f'"{etag}"'})
+            self.assertEqual(resp.status_code, 200)
+            self.assertIn("New comment", resp.get_data(as_text=True))
+
+    def test_http_caching_private_for_users(self):
+        """Are pages for logged-in users kept out of shared caches?"""
+        SeedVersion.record("13.14.1")
+        user = User.signup("testuser", "password", "testuser@email.com")
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess[CURR_USER_KEY] = user.id
+            resp = c.get("/")
+
+            self.assertEqual(resp.status_code, 200)
+            self.assertIsNone(resp.get_etag()[0])
+            self.assertIn("private", resp.headers["Cache-Control"])
+            self.assertNotIn("public", resp.headers["Cache-Control"])
+            self.assertIn("Cookie", resp.headers.get("Vary", ""))
@@ -0,0 +1,140 @@
+#  terminal:
+#  python -m unittest test_ddragon.py
+
+import json
+import os
+import tarfile
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+from ddragon import fetch_champion_data, open_source, DirectorySource, TarballSource
+
+STUB_DELAY = 0.05
+STUB_CHAMPIONS = [f"Champion{i}" for i in range(20)]
+
+
+class StubDataDragonHandler(BaseHTTPRequestHandler):
+    """Serves a tiny fake Data Dragon with a fixed per-request latency"""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(STUB_DELAY)
+        if self.path == "/data/en_US/champion.json":
+            payload = {"data": {name: {"id": name} for name in STUB_CHAMPIONS}}
+        else:
+            name = self.path.rsplit("/", 1)[-1].removesuffix(".json")
+            if name not in STUB_CHAMPIONS:
+                self.send_error(404)
+                return
+            payload = {"data": {name: {"id": name, "tags": ["Tank"], "title": f"{name} title"}}}
+
+        body = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class DataDragonFetchTestCase(TestCase):
+    """Test concurrent Data Dragon fetching against a local stub server"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubDataDragonHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_fetch_champion_data(self):
+        """Are all champions fetched, keyed and ordered by name?"""
+        data = fetch_champion_data(self.base_url, concurrency=4)
+
+        self.assertEqual(list(data), STUB_CHAMPIONS)
+        self.assertEqual(data["Champion3"]["title"], "Champion3 title")
+
+    def test_concurrent_fetch_speedup(self):
+        """Is a concurrent fetch much faster than a sequential one?"""
+        start = time.perf_counter()
+        sequential = fetch_champion_data(self.base_url, concurrency=1)
+        sequential_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concurrent = fetch_champion_data(self.base_url, concurrency=10)
+        concurrent_time = time.perf_counter() - start
+
+        self.assertEqual(sequential, concurrent)
+        self.assertLess(concurrent_time * 3, sequential_time)
+
+
+def write_dragontail(root, version, champions):
+    """Write a minimal dragontail-<version> layout with a couple of decoy files"""
+    data_dir = os.path.join(root, f"dragontail-{version}", version, "data")
+    os.makedirs(os.path.join(data_dir, "en_US", "champion"))
+    os.makedirs(os.path.join(data_dir, "de_DE", "champion"))
+    os.makedirs(os.path.join(root, f"dragontail-{version}", "img", "champion"))
+
+    def dump(path, payload):
+        with open(path, "w") as f:
+            json.dump(payload, f)
+
+    dump(os.path.join(data_dir, "en_US", "champion.json"),
+         {"version": version, "data": {name: {"id": name} for name in champions}})
+    dump(os.path.join(data_dir, "en_US", "profileicon.json"), {"data": {"1": {"id": 1}}})
+    for name in champions:
+        dump(os.path.join(data_dir, "en_US", "champion", f"{name}.json"),
+             {"data": {name: {"id": name, "title": f"{name} title", "tags": ["Mage"]}}})
+        dump(os.path.join(data_dir, "de_DE", "champion", f"{name}.json"),
+             {"data": {name: {"id": name, "title": f"{name} Titel"}}})
+    with open(os.path.join(root, f"dragontail-{version}", "img", "champion", "splash.jpg"), "wb") as f:
+        f.write(b"\xff\xd8" * 1024)
+    return os.path.join(root, f"dragontail-{version}")
+
+
+class OfflineSourceTestCase(TestCase):
+    """Test seeding sources backed by a dragontail snapshot"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.champions = ["Zed", "Ahri", "Garen"]
+        self.directory = write_dragontail(self.tmp.name, "13.14.1", self.champions)
+        self.tarball = os.path.join(self.tmp.name, "dragontail-13.14.1.tgz")
+        with tarfile.open(self.tarball, "w:gz") as archive:
+            archive.add(self.directory, arcname="dragontail-13.14.1")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_open_source(self):
+        """Does open_source pick the right source for a path?"""
+        self.assertIsInstance(open_source(self.directory), DirectorySource)
+        self.assertIsInstance(open_source(self.tarball), TarballSource)
+
+    def test_directory_source(self):
+        """Are champions read from an extracted directory in list order?"""
+        source = open_source(self.tmp.name)
+        data = source.champion_data()
+
+        self.assertEqual(list(data), self.champions)
+        self.assertEqual(data["Ahri"]["title"], "Ahri title")
+        self.assertEqual(source.version, "13.14.1")
+        self.assertEqual(source.profile_icons(), {"1": {"id": 1}})
+
+    def test_tarball_source(self):
+        """Are champions streamed out of the archive without extracting it?"""
+        source = open_source(self.tarball)
+        data = source.champion_data()
+
+        self.assertEqual(list(data), self.champions)
+        self.assertEqual(data["Zed"]["title"], "Zed title")
+        self.assertEqual(source.version, "13.14.1")
+        self.assertEqual(source.profile_icons(), {"1": {"id": 1}})
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["dragontail-13.14.1", "dragontail-13.14.1.tgz"])
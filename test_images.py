@@ -0,0 +1,99 @@
+#  terminal:
+#  python -m unittest test_images.py
+
+import io
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+from PIL import Image
+from app import app, resized, IMAGE_MAX_AGE
+
+
+def make_image(size, image_format):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, (200, 120, 40)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+STUB_IMAGES = {
+    "/cdn/img/champion/splash/Ahri_0.jpg": make_image((1215, 717), "JPEG"),
+    "/cdn/13.14.1/img/spell/AhriQ.png": make_image((64, 64), "PNG"),
+}
+
+
+class StubImageHandler(BaseHTTPRequestHandler):
+    """Serves a couple of fake Data Dragon images and counts requests"""
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        body = STUB_IMAGES.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg" if self.path.endswith(".jpg") else "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ImageCacheTestCase(TestCase):
+    """Test the local Data Dragon image cache against a stub origin"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubImageHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        StubImageHandler.requests = []
+
+        self.tmp = tempfile.TemporaryDirectory()
+        app.config['IMAGE_CACHE_DIR'] = self.tmp.name
+        app.config['IMAGE_ORIGIN'] = f"http://127.0.0.1:{self.server.server_port}"
+        self.client = app.test_client()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_resized_filter(self):
+        """Are Data Dragon URLs rewritten and other URLs left alone?"""
+        with app.test_request_context():
+            self.assertEqual(
+                resized("http://ddragon.leagueoflegends.com/cdn/img/champion/splash/Ahri_0.jpg", "card"),
+                "/images/card/img/champion/splash/Ahri_0.jpg")
+            self.assertEqual(resized("http://example.com/me.png", "icon"), "http://example.com/me.png")
+            self.assertIsNone(resized(None, "icon"))
+
+    def test_fetch_once_and_resize(self):
+        """Is the origin hit once, with each variant resized from the stored original?"""
+        for variant, width in [("card", 640), ("large", 960), ("card", 640)]:
+            resp = self.client.get(f"/images/{variant}/img/champion/splash/Ahri_0.jpg")
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.mimetype, "image/jpeg")
+            self.assertEqual(resp.cache_control.max_age, IMAGE_MAX_AGE)
+            with Image.open(io.BytesIO(resp.data)) as image:
+                self.assertEqual(image.size[0], width)
+            resp.close()
+
+        self.assertEqual(StubImageHandler.requests, ["/cdn/img/champion/splash/Ahri_0.jpg"])
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "original/img/champion/splash/Ahri_0.jpg")))
+
+    def test_small_images_not_upscaled(self):
+        """Are icons already within the bounding box left at their size?"""
+        resp = self.client.get("/images/avatar/13.14.1/img/spell/AhriQ.png")
+        with Image.open(io.BytesIO(resp.data)) as image:
+            self.assertEqual(image.size, (64, 64))
+        resp.close()
+
+    def test_bad_requests(self):
+        """Are unknown variants, odd paths and missing images rejected?"""
+        self.assertEqual(self.client.get("/images/huge/img/champion/splash/Ahri_0.jpg").status_code, 404)
+        self.assertEqual(self.client.get("/images/card/../api_keys.py").status_code, 404)
+        self.assertEqual(self.client.get("/images/card/img/champion/splash/Nobody_0.jpg").status_code, 404)
@@ -0,0 +1,113 @@
+#  terminal:
+#  export SQLALCHEMY_DATABASE_URI=postgresql:///lol-dex-test
+#  python -m unittest test_metrics.py
+
+import os
+import re
+from unittest import TestCase
+from unittest.mock import patch
+from database import db
+from models import Champion
+from app import app, request_metrics
+
+
+def metric_value(text, name, **labels):
+    """Return the value of one sample in Prometheus text output"""
+    label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf'^{re.escape(name)}\{{{re.escape(label_text)}\}} (\S+)$', text, re.M)
+    return float(match.group(1)) if match else None
+
+
+class MetricsTestCase(TestCase):
+    """Test per-endpoint request metrics and the /metrics endpoint"""
+
+    def setUp(self):
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("SQLALCHEMY_DATABASE_URI", "postgresql:///lol-dex-test")
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        app.config['SECRET_KEY'] = "TEST_SECRET_KEY"
+
+        self.client = app.test_client()
+
+        self.app_context = app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+        db.session.add(Champion(name="Ahri", title="the Nine-Tailed Fox", tags=["Mage"],
+                                image_url="http://example.com/ahri.png", skins=[], abilities=[]))
+        db.session.commit()
+        request_metrics.reset()
+
+    def tearDown(self):
+        """Clean up fouled transactions."""
+        app.config['SLOW_REQUEST_THRESHOLD'] = None
+        app.config['METRICS_TOKEN'] = None
+        db.session.rollback()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_metrics_endpoint(self):
+        """Are latency, SQL and render numbers exported per endpoint?"""
+        self.client.get("/champion/Ahri")
+        self.client.get("/champion/Ahri")
+        self.client.get("/champion/Nobody")
+
+        resp = self.client.get("/metrics")
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.content_type.startswith("text/plain; version=0.0.4"))
+        text = resp.get_data(as_text=True)
+
+        self.assertEqual(metric_value(text, "http_requests_total", endpoint="champion", method="GET", status=200), 2)
+        self.assertEqual(metric_value(text, "http_requests_total", endpoint="champion", method="GET", status=404), 1)
+        self.assertEqual(metric_value(text, "http_request_duration_seconds_count", endpoint="champion", method="GET"), 3)
+        self.assertEqual(metric_value(text, "http_request_duration_seconds_bucket",
+                                      endpoint="champion", method="GET", le="+Inf"), 3)
+        self.assertGreater(metric_value(text, "db_statements_total", endpoint="champion", method="GET"), 3)
+        self.assertGreater(metric_value(text, "db_duration_seconds_total", endpoint="champion", method="GET"), 0)
+        self.assertGreater(metric_value(text, "template_render_seconds_total", endpoint="champion", method="GET"), 0)
+        self.assertIn("# TYPE http_request_duration_seconds histogram", text)
+        self.assertIn("# TYPE champion_fragment_cache_hits_total counter", text)
+
+    def test_histogram_buckets_cumulative(self):
+        """Does each bucket count every request at or below its bound?"""
+        for _ in range(3):
+            self.client.get("/champion/Ahri")
+        text = request_metrics.render()
+
+        counts = [float(count) for count in re.findall(
+            r'^http_request_duration_seconds_bucket\{endpoint="champion",method="GET",le="[^"]+"\} (\S+)$', text, re.M)]
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(counts[-1], 3)
+
+    def test_slow_request_logged(self):
+        """Are requests over the threshold logged with their queries?"""
+        app.config['SLOW_REQUEST_THRESHOLD'] = 0
+        with self.assertLogs(app.logger, level="WARNING") as logs:
+            self.client.get("/champion/Ahri")
+
+        self.assertIn("Slow request: GET /champion/Ahri", logs.output[0])
+        self.assertIn("FROM champions", logs.output[0])
+
+    def test_unhandled_error_counted(self):
+        """Is a view that raises still counted, as a 500?"""
+        def broken(tag_name):
+            raise RuntimeError("boom")
+
+        with patch.dict(app.view_functions, {"tag": broken}), \
+                patch.dict(app.config, {"PROPAGATE_EXCEPTIONS": True}):
+            with self.assertRaises(RuntimeError):
+                self.client.get("/tag/Mage")
+
+        text = request_metrics.render()
+        self.assertEqual(metric_value(text, "http_requests_total", endpoint="tag", method="GET", status=500), 1)
+
+    def test_metrics_access(self):
+        """Is /metrics limited to loopback clients or holders of METRICS_TOKEN?"""
+        remote = {"REMOTE_ADDR": "203.0.113.7"}
+        self.assertEqual(self.client.get("/metrics").status_code, 200)
+        self.assertEqual(self.client.get("/metrics", environ_base=remote).status_code, 403)
+
+        app.config['METRICS_TOKEN'] = "scrape-secret"
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        resp = self.client.get("/metrics", environ_base=remote, headers={"Authorization": "Bearer scrape-secret"})
+        self.assertEqual(resp.status_code, 200)
@@ -0,0 +1,93 @@
+#  terminal:
+#  export SQLALCHEMY_DATABASE_URI=postgresql:///lol-dex-test
+#  python -m unittest test_replicas.py
+
+import os
+from unittest import TestCase
+from unittest.mock import patch
+from sqlalchemy import create_engine, insert
+from sqlalchemy.pool import StaticPool
+from database import db
+from models import Champion, User
+from replicas import REPLICA_BIND, PRIMARY_UNTIL_KEY, engine_options
+from app import app, CURR_USER_KEY
+
+
+class ReplicaRoutingTestCase(TestCase):
+    """Test routing read-only views to a replica, with read-your-writes"""
+
+    def setUp(self):
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("SQLALCHEMY_DATABASE_URI", "postgresql:///lol-dex-test")
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        app.config['SECRET_KEY'] = "TEST_SECRET_KEY"
+        app.config['BCRYPT_LOG_ROUNDS'] = 4
+
+        self.client = app.test_client()
+
+        self.app_context = app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+        ahri = Champion(name="Ahri", title="the Nine-Tailed Fox", tags=["Mage"], skins=[], abilities=[])
+        user = User.signup(username="replica-user", email="replica@example.com", password="password")
+        db.session.add(ahri)
+        db.session.commit()
+        self.ahri_id, self.user_id = ahri.id, user.id
+
+        # A stand-in replica that is behind: it has the user, but only Zed
+        self.replica = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        db.metadata.create_all(self.replica)
+        with self.replica.begin() as conn:
+            conn.execute(insert(User), [dict(id=user.id, username=user.username, email=user.email,
+                                             password=user.password)])
+            conn.execute(insert(Champion), [dict(name="Zed", title="the Master of Shadows", skins=[], abilities=[])])
+
+    def tearDown(self):
+        """Clean up fouled transactions."""
+        db.session.rollback()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        self.replica.dispose()
+
+    def test_no_replica(self):
+        """Without a replica bind, do reads and writes all use the primary?"""
+        self.assertEqual(self.client.get("/champion/Ahri").status_code, 200)
+
+        with self.client.session_transaction() as sess:
+            sess[CURR_USER_KEY] = self.user_id
+        self.assertEqual(self.client.put(f"/favorite/{self.ahri_id}").status_code, 200)
+        with self.client.session_transaction() as sess:
+            self.assertNotIn(PRIMARY_UNTIL_KEY, sess)
+
+    def test_read_only_views_use_replica(self):
+        """Are read-only views served from the replica, and other views from the primary?"""
+        with patch.dict(db.engines, {REPLICA_BIND: self.replica}):
+            self.assertEqual(self.client.get("/champion/Zed").status_code, 200)
+            self.assertEqual(self.client.get("/champion/Ahri").status_code, 404)
+
+            # Not marked read-only
+            with self.client.session_transaction() as sess:
+                sess[CURR_USER_KEY] = self.user_id
+            self.assertEqual(self.client.get("/profile/replica-user/edit").status_code, 200)
+
+    def test_read_your_writes(self):
+        """After a write, does the acting user read from the primary until the window passes?"""
+        with patch.dict(db.engines, {REPLICA_BIND: self.replica}):
+            with self.client.session_transaction() as sess:
+                sess[CURR_USER_KEY] = self.user_id
+            self.assertEqual(self.client.put(f"/favorite/{self.ahri_id}").status_code, 200)
+            self.assertEqual(self.client.get("/champion/Ahri").status_code, 200)
+
+            # Other visitors still read from the replica
+            self.assertEqual(app.test_client().get("/champion/Ahri").status_code, 404)
+
+            with self.client.session_transaction() as sess:
+                sess[PRIMARY_UNTIL_KEY] = 0
+            self.assertEqual(self.client.get("/champion/Ahri").status_code, 404)
+
+    def test_engine_options(self):
+        """Are pool settings read from the environment, and skipped for SQLite?"""
+        self.assertEqual(engine_options("sqlite://", {"DB_POOL_SIZE": "5"}), {})
+        options = engine_options("postgresql:///lol-dex", {"DB_POOL_SIZE": "5", "DB_POOL_PRE_PING": "false"})
+        self.assertEqual(options, {'pool_size': 5, 'max_overflow': 20, 'pool_recycle': 1800, 'pool_pre_ping': False})
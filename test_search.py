@@ -0,0 +1,74 @@
+#  terminal:
+#  python -m unittest test_search.py
+
+from collections import namedtuple
+from unittest import TestCase
+from unittest.mock import patch
+from search import SearchIndex, normalize, typo_distance
+
+Card = namedtuple("Card", ["name", "title"])
+
+CHAMPIONS = [
+    Card("Kai'Sa", "Daughter of the Void"),
+    Card("Kassadin", "the Void Walker"),
+    Card("Kayle", "the Righteous"),
+    Card("Akali", "the Rogue Assassin"),
+    Card("Ahri", "the Nine-Tailed Fox"),
+    Card("Twisted Fate", "the Card Master"),
+    Card("Dr. Mundo", "the Madman of Zaun"),
+    Card("Garen", "The Might of Demacia"),
+]
+
+
+class SearchIndexTestCase(TestCase):
+    """Test the in-memory champion search index"""
+
+    def setUp(self):
+        self.index = SearchIndex(CHAMPIONS)
+
+    def names(self, query, limit=10):
+        return [champion.name for champion in self.index.search(query, limit)]
+
+    def test_normalize(self):
+        """Are punctuation, spaces and case ignored?"""
+        self.assertEqual(normalize("Kai'Sa"), "kaisa")
+        self.assertEqual(normalize("Dr. Mundo"), "drmundo")
+        self.assertEqual(typo_distance("ahir", "ahri"), 1)
+
+    def test_ranking(self):
+        """Do prefix matches rank before substring and title matches?"""
+        self.assertEqual(self.names("ka"), ["Kai'Sa", "Kayle", "Kassadin", "Akali"])
+        self.assertEqual(self.names("fate"), ["Twisted Fate"])
+        self.assertEqual(self.names("void"), ["Kai'Sa", "Kassadin"])
+
+    def test_typo_tolerance(self):
+        """Are punctuation-free and misspelled names still found?"""
+        self.assertEqual(self.names("kaisa")[0], "Kai'Sa")
+        self.assertEqual(self.names("dr mundo"), ["Dr. Mundo"])
+        self.assertEqual(self.names("ahir"), ["Ahri"])
+        self.assertEqual(self.names("twsited"), ["Twisted Fate"])
+        self.assertEqual(self.names("zzz"), [])
+
+    def test_limit(self):
+        """Is the number of results capped by the limit?"""
+        self.assertEqual(self.names("ka", limit=2), ["Kai'Sa", "Kayle"])
+        self.assertEqual(self.names("", limit=2), [])
+
+    def test_typo_candidates_from_trigrams(self):
+        """Are edit distances only computed for names sharing two trigrams with the query?"""
+        others = ["Ahmad", "Tahir", "Twitch", "Trundle", "Mordekaiser", "Darius", "Draven", "Zyra", "Xerath"]
+        index = SearchIndex(CHAMPIONS + [Card(name, "the Test Champion") for name in others])
+
+        expected = {
+            # Akali shares only "  a" with "ahir"; Tahir is already a substring match
+            "ahir": (["ahri", "ahma"], ["Tahir", "Ahri"]),
+            "twsited": (["twisted", "twitch"], ["Twisted Fate"]),
+            "drmundo": (["draven"], ["Dr. Mundo"]),
+            "zzzz": ([], []),
+        }
+        for query, (compared, found) in expected.items():
+            with self.subTest(query=query):
+                with patch("search.typo_distance", wraps=typo_distance) as distance:
+                    results = index.ranked(query)
+                self.assertCountEqual([call.args[1] for call in distance.call_args_list], compared)
+                self.assertEqual([champion.name for champion in results], found)
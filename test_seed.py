@@ -0,0 +1,260 @@
+#  terminal:
+#  export SQLALCHEMY_DATABASE_URI=postgresql:///lol-dex-test
+#  python -m unittest test_seed.py
+
+import copy
+import gzip
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+from database import db
+from models import Champion, SeedVersion, Tag
+from app import app, populate_champions, get_data_source, page_cache, DDRAGON_VERSION
+from test_ddragon import write_dragontail
+
+
+def make_champion_info(name, title):
+    return {
+        "id": name,
+        "title": title,
+        "tags": ["Fighter", "Tank"],
+        "lore": f"{name} lore",
+        "info": {"difficulty": 4},
+        "spells": [{"name": "Q", "image": {"group": "spell", "full": f"{name}Q.png"}}],
+        "passive": {"name": "Passive", "image": {"group": "passive", "full": f"{name}P.png"}},
+        "allytips": ["Ally tip"],
+        "enemytips": ["Enemy tip"],
+        "skins": [{"id": "1000", "num": 0, "name": "default"}],
+    }
+
+
+CHAMPION_DATA = {
+    "Garen": make_champion_info("Garen", "The Might of Demacia"),
+    "Darius": make_champion_info("Darius", "The Hand of Noxus"),
+}
+
+
+class SeedTestCase(TestCase):
+    """Test seeding champions from Data Dragon data"""
+
+    def setUp(self):
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("SQLALCHEMY_DATABASE_URI", "postgresql:///lol-dex-test")
+        app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        app.config['SECRET_KEY'] = "TEST_SECRET_KEY"
+        self.bundle_dir = tempfile.TemporaryDirectory()
+        app.config['CHAMPION_BUNDLE_DIR'] = self.bundle_dir.name
+
+        self.app_context = app.app_context()
+        self.app_context.push()
+
+        db.create_all()
+
+    def tearDown(self):
+        """Clean up fouled transactions."""
+        db.session.rollback()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        self.bundle_dir.cleanup()
+
+    def seed(self, champion_data):
+        with patch('app.get_champion_data', return_value=copy.deepcopy(champion_data)):
+            return populate_champions()
+
+    def test_seed_adds_champions(self):
+        """Does a first seed add every champion and record the patch?"""
+        counts = self.seed(CHAMPION_DATA)
+
+        self.assertEqual(counts, {'added': 2, 'changed': 0, 'unchanged': 0})
+        self.assertEqual(Champion.query.count(), 2)
+        self.assertEqual(SeedVersion.current(), DDRAGON_VERSION)
+
+        garen = Champion.query.filter_by(name="Garen").first()
+        self.assertEqual(garen.role, "Fighter")
+        self.assertEqual(len(garen.content_hash), 64)
+        self.assertTrue(garen.passive['image_url'].endswith("/img/passive/GarenP.png"))
+
+    def test_reseed_skips_unchanged(self):
+        """Does a reseed only update champions whose payload changed?"""
+        self.seed(CHAMPION_DATA)
+        darius = Champion.query.filter_by(name="Darius").first()
+        darius_hash = darius.content_hash
+
+        changed_data = copy.deepcopy(CHAMPION_DATA)
+        changed_data["Garen"]["title"] = "The Might of Demacia (Updated)"
+        counts = self.seed(changed_data)
+
+        self.assertEqual(counts, {'added': 0, 'changed': 1, 'unchanged': 1})
+        self.assertEqual(Champion.query.filter_by(name="Garen").first().title,
+                         "The Might of Demacia (Updated)")
+        self.assertEqual(Champion.query.filter_by(name="Darius").first().content_hash, darius_hash)
+        self.assertEqual(SeedVersion.query.count(), 2)
+
+        self.seed(changed_data)
+        self.assertEqual(SeedVersion.query.count(), 2)
+
+    def test_seed_in_batches(self):
+        """Are bulk inserts and updates applied across several batches?"""
+        champion_data = {name: make_champion_info(name, f"{name} title")
+                         for name in ["Ahri", "Annie", "Ashe", "Garen", "Darius"]}
+        with patch('app.get_champion_data', return_value=copy.deepcopy(champion_data)):
+            counts = populate_champions(batch_size=2)
+        self.assertEqual(counts['added'], 5)
+
+        champion_data["Ahri"]["title"] = "The Nine-Tailed Fox"
+        champion_data["Ashe"]["title"] = "The Frost Archer"
+        with patch('app.get_champion_data', return_value=copy.deepcopy(champion_data)):
+            counts = populate_champions(batch_size=1)
+
+        self.assertEqual(counts, {'added': 0, 'changed': 2, 'unchanged': 3})
+        self.assertEqual(Champion.query.filter_by(name="Ashe").first().title, "The Frost Archer")
+
+    def test_failed_seed_rolls_back(self):
+        """Does a seed that fails part way leave nothing behind, so a retry applies it?"""
+        self.seed(CHAMPION_DATA)
+        revision = SeedVersion.latest_id()
+        changed_data = copy.deepcopy(CHAMPION_DATA)
+        changed_data["Garen"]["title"] = "The Might of Demacia (Updated)"
+
+        with patch.object(Tag, 'refresh', side_effect=RuntimeError("tags table is locked")), \
+                patch('app.get_champion_data', return_value=copy.deepcopy(changed_data)):
+            with self.assertRaises(RuntimeError):
+                populate_champions(batch_size=1)
+        self.assertEqual(Champion.query.filter_by(name="Garen").first().title, "The Might of Demacia")
+        self.assertEqual(SeedVersion.latest_id(), revision)
+
+        self.assertEqual(self.seed(changed_data), {'added': 0, 'changed': 1, 'unchanged': 1})
+        self.assertNotEqual(SeedVersion.latest_id(), revision)
+
+    def test_seed_survives_bundle_errors(self):
+        """Is a seed still committed and reported if its bundle can't be written?"""
+        with patch('app.write_bundle', side_effect=OSError("disk full")):
+            counts = self.seed(CHAMPION_DATA)
+        self.assertEqual(counts['added'], 2)
+        self.assertIsNotNone(SeedVersion.latest_id())
+
+    def test_seed_from_snapshot(self):
+        """Can we seed from an offline dragontail snapshot of another patch?"""
+        with tempfile.TemporaryDirectory() as tmp:
+            write_dragontail(tmp, "13.15.1", ["Ahri", "Zed"])
+            counts = populate_champions(get_data_source(tmp))
+
+        self.assertEqual(counts['added'], 2)
+        self.assertEqual(SeedVersion.current(), "13.15.1")
+        self.assertEqual(Champion.query.filter_by(name="Zed").first().role, "Mage")
+
+    def test_seed_materializes_tags(self):
+        """Does a seed rebuild per-tag champion lists, served with counts at /tags?"""
+        data = copy.deepcopy(CHAMPION_DATA)
+        data["Darius"]["tags"] = ["Fighter"]
+        self.seed(data)
+
+        ids = {champion.name: champion.id for champion in Champion.query}
+        self.assertEqual(db.session.get(Tag, "Fighter").champion_ids, sorted(ids.values()))
+        self.assertEqual(db.session.get(Tag, "Tank").champion_ids, [ids["Garen"]])
+
+        resp = app.test_client().get("/tags")
+        self.assertEqual(resp.json, [{"name": "Fighter", "count": 2, "url": "/tag/Fighter"},
+                                     {"name": "Tank", "count": 1, "url": "/tag/Tank"}])
+
+        # Tag pages list the materialized ids, not every champion's tags
+        db.session.get(Tag, "Fighter").champion_ids = [ids["Garen"]]
+        db.session.commit()
+        resp = app.test_client().get("/tag/Fighter")
+        self.assertIn(b"Garen", resp.data)
+        self.assertNotIn(b"Darius", resp.data)
+        self.assertEqual(app.test_client().get("/tag/Marksman").status_code, 404)
+
+        self.seed(CHAMPION_DATA)
+        self.assertEqual(db.session.get(Tag, "Tank").champion_count, 2)
+
+    def test_page_cache_versioned_by_seed(self):
+        """Are anonymous pages rendered once per seed, and refreshed by a reseed?"""
+        self.seed(CHAMPION_DATA)
+        client = app.test_client()
+
+        first = client.get("/search?q=gar")
+        hits = page_cache.hits
+        self.assertEqual(client.get("/search?q=gar").json, first.json)
+        self.assertEqual(page_cache.hits, hits + 1)
+
+        # Query args the view ignores, or limits it clamps, share the same entry
+        size = len(page_cache)
+        client.get("/search?q=gar&utm_source=junk")
+        client.get("/search?q=gar&limit=900")
+        client.get("/search?q=gar&limit=999")
+        self.assertEqual(page_cache.hits, hits + 3)
+        self.assertEqual(len(page_cache), size + 1)
+
+        data = copy.deepcopy(CHAMPION_DATA)
+        data["Garen"]["title"] = "The Gardener"
+        data["Garrosh"] = make_champion_info("Garrosh", "The Test Champion")
+        self.seed(data)
+        self.assertEqual(client.get("/search?q=gar").json, ["Garen", "Garrosh"])
+
+    def test_seed_writes_bundle(self):
+        """Does a seed write a slim, precompressed champions-<patch>-<revision>.json bundle?"""
+        self.seed(CHAMPION_DATA)
+        path = os.path.join(self.bundle_dir.name, f"champions-{DDRAGON_VERSION}-{SeedVersion.latest_id()}.json")
+
+        with open(path, "rb") as f:
+            payload = f.read()
+        with open(path + ".gz", "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()), payload)
+
+        bundle = json.loads(payload)
+        self.assertEqual(bundle["version"], DDRAGON_VERSION)
+        self.assertEqual(bundle["revision"], SeedVersion.latest_id())
+        self.assertEqual([champion["name"] for champion in bundle["champions"]], ["Garen", "Darius"])
+        self.assertEqual(set(bundle["champions"][0]), {"id", "name", "title", "image_url", "tags"})
+
+    def test_reseed_renames_bundle(self):
+        """Does a reseed on the same patch get a new bundle URL?"""
+        self.seed(CHAMPION_DATA)
+        first = os.listdir(self.bundle_dir.name)
+
+        data = copy.deepcopy(CHAMPION_DATA)
+        data["Garen"]["title"] = "The Gardener"
+        self.seed(data)
+        url = f"/bundles/champions-{DDRAGON_VERSION}-{SeedVersion.latest_id()}.json"
+        self.assertNotIn(os.path.basename(url), first)
+        self.assertEqual(app.test_client().get(url).json["champions"][0]["title"], "The Gardener")
+
+    def test_bundle_built_on_other_hosts(self):
+        """Does a host that did not run the seed build the latest bundle on demand?"""
+        self.seed(CHAMPION_DATA)
+        with tempfile.TemporaryDirectory() as other_host:
+            app.config['CHAMPION_BUNDLE_DIR'] = other_host
+            client = app.test_client()
+            resp = client.get(f"/bundles/champions-{DDRAGON_VERSION}-{SeedVersion.latest_id()}.json")
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(len(resp.json["champions"]), 2)
+            # Only the latest revision is built
+            resp = client.get(f"/bundles/champions-{DDRAGON_VERSION}-{SeedVersion.latest_id() + 1}.json")
+            self.assertEqual(resp.status_code, 404)
+
+    def test_bundle_served_precompressed(self):
+        """Is the bundle served compressed, immutable and linked from the homepage?"""
+        self.seed(CHAMPION_DATA)
+        client = app.test_client()
+
+        resp = client.get("/")
+        url = f"/bundles/champions-{DDRAGON_VERSION}-{SeedVersion.latest_id()}.json"
+        self.assertIn(f'data-bundle-url="{url}"', resp.get_data(as_text=True))
+        self.assertNotIn("Garen", resp.get_data(as_text=True))
+
+        resp = client.get(url, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.content_encoding, "gzip")
+        self.assertIn("Accept-Encoding", resp.vary)
+        self.assertTrue(resp.cache_control.immutable)
+        self.assertEqual(json.loads(gzip.decompress(resp.data))["version"], DDRAGON_VERSION)
+
+        resp = client.get(url)
+        self.assertIsNone(resp.content_encoding)
+        self.assertEqual(len(resp.json["champions"]), 2)
+
+        self.assertEqual(client.get("/bundles/champions-13.1.1-1.json").status_code, 404)
+        self.assertEqual(client.get("/bundles/secrets.txt").status_code, 404)
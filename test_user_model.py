@@ -3,10 +3,13 @@
 #  python -m unittest test_user_model.py
 #  WSL: export SQLALCHEMY_DATABASE_URI=postgresql:///lol-dex-test; python -m unittest test_user_model.py
 
+import os
+import threading
+import time
 from unittest import TestCase
 from sqlalchemy.exc import IntegrityError
-from flask import Flask
-from database import db, bcrypt
+from flask import Flask, current_app
+from database import db
 from models import Champion, User, Favorite, Comment
 
 
@@ -16,12 +19,13 @@ class UserModelTestCase(TestCase):
     def setUp(self):
         """Create test client, add sample data."""
         app = Flask(__name__)
-        app.config['SQLALCHEMY_DATABASE_URI'] = "postgresql:///lol-dex-test"
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("SQLALCHEMY_DATABASE_URI", "postgresql:///lol-dex-test")
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
         app.config['SECRET_KEY'] = "TEST_SECRET_KEY"
+        app.config['BCRYPT_LOG_ROUNDS'] = 4
 
         db.init_app(app)
-        bcrypt.init_app(app)
+        self.app = app
 
         self.client = app.test_client()
 
@@ -64,6 +68,18 @@ class UserModelTestCase(TestCase):
         bad_user = User.authenticate("testuser1", "wrongpassword")
         self.assertFalse(bad_user)
 
+    def test_user_rehash_on_login(self):
+        """Is the password rehashed on login after the work factor changes?"""
+        self.assertTrue(self.user1.password.startswith("$2b$04$"))
+
+        current_app.config['BCRYPT_LOG_ROUNDS'] = 5
+        user = User.authenticate("testuser1", "Abcdefg123!")
+        db.session.commit()
+
+        self.assertTrue(user.password.startswith("$2b$05$"))
+        self.assertTrue(User.authenticate("testuser1", "Abcdefg123!"))
+        self.assertFalse(User.authenticate("testuser1", "wrongpassword"))
+
     def test_unique_username(self):
         """Does the model correctly prevent duplicate usernames?"""
         with self.assertRaises(IntegrityError):
@@ -78,7 +94,7 @@ class UserModelTestCase(TestCase):
 
     def test_user_favorite_relationship(self):
         """Does the Favorite relationship in the User model work?"""
-        champion = Champion(name="Test Champion", role="Role", tags=["Tag 1", "Tag 2"],
+        champion = Champion(name="Test Champion", tags=["Tag 1", "Tag 2"],
                             image_url="http://example.com/test_champ.png",
                             description="Test Champion description",
                             title="Test Champion title",
@@ -95,7 +111,7 @@ class UserModelTestCase(TestCase):
 
     def test_user_comment_relationship(self):
         """Does the Comment relationship in the User model work?"""
-        champion = Champion(name="Test Champion", role="Role", tags=["Tag 1", "Tag 2"],
+        champion = Champion(name="Test Champion", tags=["Tag 1", "Tag 2"],
                             image_url="http://example.com/test_champ.png",
                             description="Test Champion description",
                             title="Test Champion title",
@@ -109,4 +125,39 @@ class UserModelTestCase(TestCase):
 
         self.assertEqual(len(self.user1.comments), 1)
         self.assertEqual(self.user1.comments[0].content, "Test comment")
-        self.assertEqual(self.user1.comments[0].champion_id, champion.id)
\ No newline at end of file
+        self.assertEqual(self.user1.comments[0].champion_id, champion.id)
+
+    def test_favorite_toggle_concurrent_insert(self):
+        """Does toggle report a favorite that a concurrent request inserted first as favorited?"""
+        if db.engine.dialect.name == 'sqlite':
+            self.skipTest("SQLite serializes writers, so toggles never race")
+        champion = Champion(name="Test Champion", tags=[], title="Test Champion title",
+                            abilities={}, passive={}, allytips={}, enemytips={}, skins={})
+        db.session.add(champion)
+        db.session.commit()
+        user_id, champion_id = self.user1.id, champion.id
+
+        # Another request has inserted the favorite but not committed yet
+        other = db.engine.connect()
+        other.execute(db.insert(Favorite).values(user_id=user_id, champion_id=champion_id))
+
+        results = []
+
+        def toggle():
+            with self.app.app_context():
+                results.append(Favorite.toggle(user_id, champion_id))
+                db.session.commit()
+
+        thread = threading.Thread(target=toggle)
+        thread.start()
+        # Wait until the toggle's INSERT is blocked on the other transaction
+        deadline = time.monotonic() + 5
+        while not db.session.execute(db.text("SELECT count(*) FROM pg_locks WHERE NOT granted")).scalar():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        other.commit()
+        other.close()
+        thread.join()
+
+        self.assertEqual(results, [True])
+        self.assertEqual(Favorite.query.filter_by(user_id=user_id).count(), 1)
@@ -3,10 +3,14 @@
 #  python -m unittest test_user_views.py
 #  WSL: export SQLALCHEMY_DATABASE_URI=postgresql:///lol-dex-test; python -m unittest test_user_views.py
 
+import os
+import re
 from unittest import TestCase
-from database import db, bcrypt
+from sqlalchemy import event
+from database import db
 from models import Champion, User, Comment, Favorite
 from flask import session
+from unittest.mock import patch
 from app import app, CURR_USER_KEY
 
 class UserViewsTestCase(TestCase):
@@ -14,9 +18,10 @@ class UserViewsTestCase(TestCase):
 
     def setUp(self):
         """Create test client, add sample data."""
-        app.config['SQLALCHEMY_DATABASE_URI'] = "postgresql:///lol-dex-test"
+        app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get("SQLALCHEMY_DATABASE_URI", "postgresql:///lol-dex-test")
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
         app.config['SECRET_KEY'] = "TEST_SECRET_KEY"
+        app.config['BCRYPT_LOG_ROUNDS'] = 4
         app.config['WTF_CSRF_ENABLED'] = False
 
         self.client = app.test_client()
@@ -32,7 +37,6 @@ class UserViewsTestCase(TestCase):
 
         champion1 = Champion(
             name="Test Champion 1", 
-            role="Tank", 
             tags=["Tank", "Fighter"],
             image_url="http://example.com/test_champ_1.png",
             description="Test Champion 1 description",
@@ -50,7 +54,6 @@ class UserViewsTestCase(TestCase):
 
         champion2 = Champion(
             name="Test Champion 2", 
-            role="Mage", 
             tags=["Mage", "Support"],
             image_url="http://example.com/test_champ_2.png",
             description="Test Champion 2 description",
@@ -187,8 +190,213 @@ class UserViewsTestCase(TestCase):
             resp = c.get(f"/profile/{self.user1.username}/comments")
             
             self.assertEqual(resp.status_code, 200)
-            self.assertIn("No comments found.", str(resp.data)) 
+            self.assertIn("No comments found.", str(resp.data))
+
+    def statements_for(self, url, data=None, status=200):
+        """Return the SQL statements a request emits (a POST if `data` is given)"""
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            if data is None:
+                resp = self.client.get(url)
+            else:
+                resp = self.client.post(url, data=data)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+        self.assertEqual(resp.status_code, status)
+        return statements
+
+    def signup_data(self, username, email):
+        return {"username": username, "email": email,
+                "password": "Abcdefg123!", "confirm_password": "Abcdefg123!"}
+
+    def test_signup_single_roundtrip(self):
+        """Does a signup insert the user without looking it up first?"""
+        statements = self.statements_for("/signup", self.signup_data("newuser", "newuser@email.com"), status=302)
+
+        self.assertEqual(len(statements), 1)
+        self.assertTrue(statements[0].startswith("INSERT INTO users"))
+        self.assertEqual(User.query.filter_by(username="newuser").count(), 1)
+
+    def test_signup_taken_username_and_email(self):
+        """Are constraint violations reported on the right field?"""
+        resp = self.client.post("/signup", data=self.signup_data("testuser1", "other@email.com"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("That username is taken", str(resp.data))
+        self.assertNotIn("That email is taken", str(resp.data))
+
+        resp = self.client.post("/signup", data=self.signup_data("otheruser", "testuser2@email.com"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("That email is taken", str(resp.data))
+        self.assertNotIn("That username is taken", str(resp.data))
+        self.assertEqual(User.query.count(), 2)
+
+    def tables_queried(self, url):
+        """Return the tables read by the SQL a request emits"""
+        return set(re.findall(r"FROM (\w+)", " ".join(self.statements_for(url))))
+
+    def test_logged_in_user_not_queried(self):
+        """Do routes that only need the session claims skip the users table?"""
+        with self.client as c:
+            c.post("/login", data={"username": "testuser1", "password": "Abcdefg123!"})
+            db.session.expunge_all()
 
+            for url in ["/", "/search?q=test", "/favorites", "/comments", "/champion/Test Champion 1"]:
+                with self.subTest(url=url):
+                    self.assertNotIn("users", self.tables_queried(url))
 
+            resp = c.get("/")
+            self.assertIn("/profile/testuser1", str(resp.data))
 
-    
+    def test_deleted_user_logged_out(self):
+        """Is a session whose user was deleted logged out instead of failing?"""
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess[CURR_USER_KEY] = 999999
+
+            resp = c.get("/profile/testuser1/edit")
+            self.assertEqual(resp.status_code, 302)
+            self.assertTrue(resp.location.endswith("/profile/testuser1/edit"))
+            with c.session_transaction() as sess:
+                self.assertNotIn(CURR_USER_KEY, sess)
+
+    def test_edit_profile_refreshes_claims(self):
+        """Does the nav bar pick up a new profile image after editing?"""
+        with self.client as c:
+            c.post("/login", data={"username": "testuser1", "password": "Abcdefg123!"})
+            c.post("/profile/testuser1/edit", data={"image_url": "http://example.com/new_icon.png"})
+
+            resp = c.get("/")
+            self.assertIn("http://example.com/new_icon.png", str(resp.data))
+
+            c.get("/logout")
+            resp = c.get("/")
+            self.assertNotIn("http://example.com/new_icon.png", str(resp.data))
+
+    def add_listing_data(self, count):
+        """Give testuser1 `count` favorites and comments on distinct champions"""
+        for i in range(count):
+            champion = Champion(name=f"Listing Champion {i}", title=f"Title {i}", tags=["Mage"])
+            db.session.add(champion)
+            db.session.flush()
+            db.session.add(Favorite(user_id=self.user1.id, champion_id=champion.id))
+            db.session.add(Comment(content=f"Listing comment {i}", user_id=self.user1.id,
+                                   champion_id=champion.id))
+        db.session.commit()
+        db.session.expunge_all()
+
+    def test_listing_query_counts(self):
+        """Do listing routes use a constant number of queries regardless of rows?"""
+        self.client.post("/login", data={"username": "testuser1", "password": "Abcdefg123!"})
+        self.add_listing_data(6)
+
+        expected = {"/favorites": 1, "/comments": 1,
+                    "/profile/testuser1/favorites": 2, "/profile/testuser1/comments": 2}
+        for url, count in expected.items():
+            with self.subTest(url=url):
+                self.assertEqual(len(self.statements_for(url)), count)
+                db.session.expunge_all()
+
+    def test_listing_pagination(self):
+        """Are listings paginated newest first with a cursor?"""
+        self.login("testuser1")
+        self.add_listing_data(5)
+
+        with patch("app.LISTING_PAGE_SIZE", 2), self.client as c:
+            resp = c.get("/profile/testuser1/comments")
+            html = resp.get_data(as_text=True)
+            self.assertIn("Listing comment 4", html)
+            self.assertIn("Listing comment 3", html)
+            self.assertNotIn("Listing comment 2", html)
+
+            cursor = re.search(r'before=([^"]+)"', html).group(1)
+            html = c.get(f"/profile/testuser1/comments?before={cursor}").get_data(as_text=True)
+            self.assertIn("Listing comment 2", html)
+            self.assertNotIn("Listing comment 3", html)
+
+            html = c.get("/favorites").get_data(as_text=True)
+            self.assertIn("Listing Champion 4", html)
+            self.assertNotIn("Listing Champion 2", html)
+            cursor = re.search(r'before=(\d+)"', html).group(1)
+            html = c.get(f"/favorites?before={cursor}").get_data(as_text=True)
+            self.assertIn("Listing Champion 2", html)
+
+            self.assertEqual(c.get("/favorites?before=oops").status_code, 400)
+            self.assertEqual(c.get("/favorites?before=%C2%B2").status_code, 400)
+
+
+    def test_champion_comment_thread(self):
+        """Is the champion comment thread served newest first in cursor pages?"""
+        for i in range(5):
+            db.session.add(Comment(content=f"Thread comment {i}", user_id=self.user1.id,
+                                   champion_id=self.champion1.id))
+        db.session.commit()
+        db.session.expunge_all()
+
+        with patch("app.COMMENT_PAGE_SIZE", 2), self.client as c:
+            html = c.get("/champion/Test Champion 1").get_data(as_text=True)
+            self.assertIn("Comments (5)", html)
+            self.assertIn("Thread comment 4", html)
+            self.assertNotIn("Thread comment 2", html)
+
+            cursor = re.search(r'data-cursor="([^"]+)"', html).group(1)
+            statements = self.statements_for(f"/champion/Test Champion 1/comments?before={cursor}")
+            self.assertEqual(len(statements), 2)
+            data = c.get("/champion/Test Champion 1/comments", query_string={"before": cursor}).json
+
+            self.assertEqual([comment["content"] for comment in data["comments"]],
+                             ["Thread comment 2", "Thread comment 1"])
+            self.assertEqual(data["comments"][0]["username"], "testuser1")
+            self.assertTrue(data["next_cursor"])
+
+            data = c.get("/champion/Test Champion 1/comments",
+                         query_string={"before": data["next_cursor"]}).json
+            self.assertEqual([comment["content"] for comment in data["comments"]], ["Thread comment 0"])
+            self.assertIsNone(data["next_cursor"])
+
+            self.assertEqual(c.get("/champion/Nobody/comments").status_code, 404)
+
+    def test_favorite_toggle(self):
+        """Does POST toggle a favorite with a single statement?"""
+        self.login("testuser1")
+        url = f"/favorite/{self.champion1.id}"
+
+        with self.client as c:
+            resp = c.post(url)
+            self.assertEqual(resp.json, {"is_favorited": True, "is_authenticated": True})
+            self.assertEqual(Favorite.query.filter_by(user_id=self.user1.id).count(), 1)
+
+            resp = c.post(url)
+            self.assertEqual(resp.json["is_favorited"], False)
+            self.assertEqual(Favorite.query.filter_by(user_id=self.user1.id).count(), 0)
+
+            self.assertEqual(c.post("/favorite/999999").status_code, 404)
+
+            # A session whose user was deleted fails the other foreign key
+            with c.session_transaction() as sess:
+                sess[CURR_USER_KEY] = 999999
+            self.assertEqual(c.post(url).status_code, 401)
+
+    def test_favorite_put_delete_idempotent(self):
+        """Can PUT and DELETE be retried without changing the outcome?"""
+        self.login("testuser1")
+        url = f"/favorite/{self.champion1.id}"
+
+        with self.client as c:
+            for _ in range(2):
+                resp = c.put(url)
+                self.assertEqual(resp.json["is_favorited"], True)
+                self.assertEqual(Favorite.query.filter_by(user_id=self.user1.id).count(), 1)
+
+            for _ in range(2):
+                resp = c.delete(url)
+                self.assertEqual(resp.json["is_favorited"], False)
+                self.assertEqual(Favorite.query.filter_by(user_id=self.user1.id).count(), 0)
+
+            c.get("/logout")
+            self.assertEqual(c.put(url).status_code, 401)